@@ -1,9 +1,10 @@
 import streamlit as st
 from datetime import datetime
-from modules import data_loader, business_logic, ui_components
+from modules import data_loader, instrumentation, metrics, rollups, ui_components
 
 st.set_page_config(page_title="Dashboard Operacional v6", page_icon="🏆", layout="wide", initial_sidebar_state="expanded")
 ui_components.load_css()
+instrumentation.start_run()
 
 # Forca a visibilidade do botao de abrir/fechar a sidebar
 st.markdown("""
@@ -18,55 +19,62 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+# Carga e Processamento (completo ou incremental, conforme configuração)
 try:
-    df_raw = data_loader.get_raw_data()
+    df_processed = data_loader.get_dashboard_data()
 except Exception as e:
     st.error(f"Erro ao carregar dados: {e}")
     st.stop()
 
-# Processamento e Filtros
-df_processed = business_logic.process_data(df_raw)
-
 with st.sidebar:
     st.markdown("---")
     if st.button("🔄 Atualizar Dados", use_container_width=True, type="primary"):
-        st.cache_data.clear()
+        # Atualiza em segundo plano; as demais sessões seguem com a versão atual até a troca
+        with st.spinner("Atualizando dados..."):
+            data_loader.refresh_data()
         st.rerun()
+    ui_components.render_data_status(data_loader.get_data_status())
+    # Metas de hoje atualizadas a cada minuto só com as linhas novas (ver modules/intraday.py)
+    ao_vivo = st.toggle("🔴 Modo ao vivo (hoje)", key="ao_vivo", help="Metas e realizado do dia atualizados a cada minuto, com a curva projetado x realizado por hora.")
+
+# Seleção (versão + filtros) em cache LRU: voltar a uma visão recente reaproveita filtro, metas e painéis
+df_filtered, filtro = ui_components.render_sidebar_filters(df_processed, aplicar=lambda f: data_loader.get_view(df_processed, f).df)
+visao = data_loader.get_view(df_processed, filtro)
+ui_components.render_export(visao)
 
-df_filtered, end_date = ui_components.render_sidebar_filters(df_processed)
-df_metas = business_logic.calculate_meta_logic(df_filtered, end_date)
+# Agregados da versão atual, filtrados com a mesma seleção das linhas
+df_cubo = visao.cubo
+with instrumentation.stage("metas", df_cubo) as etapa:
+    df_metas = etapa.saida(visao.get('metas', lambda: rollups.metas(df_cubo)))
 
 # Cálculos de KPI
-total_bruto = df_filtered.shape[0]
-total_liquido = df_filtered['Eh_Novo_Episodio'].sum()
-taxa_duplicidade = ((total_bruto - total_liquido) / total_bruto * 100) if total_bruto > 0 else 0
+with instrumentation.stage("kpis", df_cubo):
+    kpis = visao.get('kpis', lambda: rollups.kpis(df_cubo))
+total_bruto = kpis['total_bruto']
+total_liquido = kpis['total_liquido']
+taxa_duplicidade = kpis['taxa_duplicidade']
 
-meta_total_sac = df_metas['Meta_SAC'].sum()
-meta_total_pend = df_metas['Meta_PEND'].sum()
+resumo = metrics.resumo_metas(kpis, df_metas)
+meta_total_sac = resumo['meta_total_sac']
+meta_total_pend = resumo['meta_total_pend']
 
-if 'Setor' in df_filtered.columns:
-    realizado_sac = df_filtered[df_filtered['Setor'].str.contains('SAC', case=False, na=False)]['Eh_Novo_Episodio'].sum()
-    realizado_pend = df_filtered[df_filtered['Setor'].str.contains('Pend', case=False, na=False)]['Eh_Novo_Episodio'].sum()
-else:
-    realizado_sac = realizado_pend = 0
+realizado_sac = kpis['realizado_sac']
+realizado_pend = kpis['realizado_pend']
 
-perc_sac = (realizado_sac / meta_total_sac * 100) if meta_total_sac > 0 else 0
-perc_pend = (realizado_pend / meta_total_pend * 100) if meta_total_pend > 0 else 0
-media_meta = (perc_sac + perc_pend) / 2
+perc_sac = resumo['perc_sac']
+perc_pend = resumo['perc_pend']
+media_meta = resumo['media_meta']
 
 # --- RENDERIZAÇÃO DA INTERFACE ---
 ui_components.render_header()
 ui_components.render_kpi_cards(total_bruto, total_liquido, taxa_duplicidade, media_meta)
-ui_components.render_gauges(perc_sac, perc_pend, realizado_sac, meta_total_sac, realizado_pend, meta_total_pend)
-
-# Ranking / Pódio
-ui_components.render_ranking_section(df_filtered)
-
-# Gráficos Principais
-ui_components.render_main_charts(df_filtered)
+if ao_vivo:
+    ui_components.render_live_panel(data_loader.get_live_rollup, filtro, data_loader.get_live_status)
+else:
+    ui_components.render_gauges(perc_sac, perc_pend, realizado_sac, meta_total_sac, realizado_pend, meta_total_pend)
 
-# Capacidade
-ui_components.render_capacity_analysis(df_filtered)
+# Seções (Desempenho, Capacidade, Mapa de Calor, Pedidos & Portais): só a visível é calculada
+ui_components.render_sections(visao)
 
-# Mapa de Calor
-ui_components.render_heatmap(df_filtered)
+# Diagnóstico de desempenho (opcional, fica desligado por padrão)
+instrumentation.render_panel()
@@ -0,0 +1,77 @@
+"""
+Gerador de planilhas sintéticas com o mesmo esquema da aba "Página1".
+
+As linhas saem em ordem cronológica (como a planilha cresce durante o dia),
+com colaboradores fixos em um setor, pedidos que voltam a ser atendidos
+pouco tempo depois (reincidência / duplicidade) e as exceções da regra de
+duplicidade ("SEM NF" e "Reclame Aqui").
+"""
+import numpy as np
+import pandas as pd
+
+PORTAIS = ['Mercado Livre', 'Amazon', 'Shopee', 'Magalu', 'Site Próprio', 'Americanas']
+PESO_PORTAIS = [0.34, 0.22, 0.18, 0.12, 0.09, 0.05]
+
+MOTIVOS = [
+    'Atraso na Entrega', 'Produto Avariado', 'Troca', 'Devolução', 'Reclame Aqui',
+    'Dúvida sobre Pedido', 'Extravio', 'Cancelamento', 'Nota Fiscal', 'Endereço Incorreto',
+]
+PESO_MOTIVOS = [0.24, 0.12, 0.1, 0.1, 0.04, 0.15, 0.06, 0.08, 0.05, 0.06]
+
+SETORES = ['SAC', 'Pendência']
+DIAS_SEMANA = ['segunda-feira', 'terça-feira', 'quarta-feira', 'quinta-feira', 'sexta-feira', 'sábado', 'domingo']
+
+ATENDIMENTOS_POR_DIA = 1500
+INICIO_EXPEDIENTE = 7 * 3600 + 30 * 60   # 07:30
+FIM_EXPEDIENTE = 17 * 3600 + 18 * 60     # 17:18
+
+def _take(valores, codigos):
+    return np.asarray(valores, dtype=object)[codigos]
+
+def generate_sheet(n_linhas, seed=42, n_dias=None, n_colaboradores=40, data_fim=None, frac_datas_invalidas=0.001):
+    """
+    Gera `n_linhas` no formato bruto da planilha (tudo texto, como vem do Google Sheets).
+    Por padrão são ~1500 atendimentos por dia útil, terminando em `data_fim` (hoje).
+    """
+    rng = np.random.default_rng(seed)
+    n_dias = n_dias or max(1, n_linhas // ATENDIMENTOS_POR_DIA)
+    dias = pd.bdate_range(end=pd.Timestamp(data_fim or pd.Timestamp.today()).normalize(), periods=n_dias)
+
+    # Linha do tempo: dia + segundo do expediente, em ordem cronológica
+    dia_idx = rng.integers(0, n_dias, n_linhas)
+    segundos = rng.integers(INICIO_EXPEDIENTE, FIM_EXPEDIENTE, n_linhas)
+    ordem = np.lexsort((segundos, dia_idx))
+    dia_idx, segundos = dia_idx[ordem], segundos[ordem]
+
+    # Colaboradores com setor fixo (60% SAC)
+    colaboradores = [f"Colaborador {i + 1:03d}" for i in range(n_colaboradores)]
+    setor_colab = np.where(rng.random(n_colaboradores) < 0.6, 0, 1)
+    colab = rng.integers(0, n_colaboradores, n_linhas)
+
+    # Pedidos: cada pedido aparece ~3 vezes, concentrado em linhas próximas no tempo
+    n_pedidos = max(n_linhas // 3, 1)
+    pedido = np.arange(n_linhas) * n_pedidos // n_linhas - (rng.geometric(0.35, n_linhas) - 1)
+    pedido = np.clip(pedido, 0, None) + 100_000_000
+    numero_pedido = pedido.astype(str).astype(object)
+    numero_pedido[rng.random(n_linhas) < 0.05] = None
+
+    sorteio_nf = rng.random(n_linhas)
+    nota_fiscal = (pedido - 99_500_000).astype(str).astype(object)
+    nota_fiscal[sorteio_nf < 0.08] = 'SEM NF'
+    nota_fiscal[(sorteio_nf >= 0.08) & (sorteio_nf < 0.12)] = None
+
+    datas_str = _take(dias.strftime('%d/%m/%Y'), dia_idx)
+    datas_str[rng.random(n_linhas) < frac_datas_invalidas] = ''
+    horas = np.array([f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}" for s in range(FIM_EXPEDIENTE + 1)], dtype=object)
+
+    return pd.DataFrame({
+        'Data': datas_str,
+        'Hora': horas[segundos],
+        'Colaborador': _take(colaboradores, colab),
+        'Setor': _take(SETORES, setor_colab[colab]),
+        'Portal': _take(PORTAIS, rng.choice(len(PORTAIS), n_linhas, p=PESO_PORTAIS)),
+        'Motivo': _take(MOTIVOS, rng.choice(len(MOTIVOS), n_linhas, p=PESO_MOTIVOS)),
+        'Numero_Pedido': numero_pedido,
+        'Nota_Fiscal': nota_fiscal,
+        'Dia_Semana': _take(DIAS_SEMANA, dias.dayofweek.to_numpy()[dia_idx]),
+    })
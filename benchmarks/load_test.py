@@ -0,0 +1,245 @@
+"""
+Teste de carga do app.py com várias sessões simultâneas (sem navegador e sem rede).
+
+Uso:
+    python -m benchmarks.load_test --sessoes 1 2 4 8 16 --saida carga_resultados.json
+    python -m benchmarks.load_test --linhas 300000 --backend duckdb --comparar carga_anterior.json
+
+Cada sessão é um AppTest (API de testes do Streamlit) rodando o app.py no mesmo
+processo, com os mesmos caches compartilhados de um servidor real, e lendo uma
+planilha sintética local no lugar do Google Sheets. As sessões trocam período,
+setores, analistas e seção ao mesmo tempo; para cada quantidade de sessões são
+medidos a latência dos reruns (p50/p95/p99), a vazão e a memória do processo.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+
+from benchmarks.generator import generate_sheet
+from benchmarks.run_benchmarks import _metadados
+from modules.instrumentation import _rss_bytes
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, 'app.py')
+
+def _rss_mb():
+    rss = _rss_bytes()
+    return None if rss is None else rss / 1e6
+
+class _AmostradorMemoria:
+    """Pico de memória residente durante um trecho, amostrado em uma thread."""
+
+    def __init__(self, intervalo=0.05):
+        self.intervalo = intervalo
+        self.pico = None
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        while not self._parar.is_set():
+            rss = _rss_mb()
+            if rss is not None:
+                self.pico = rss if self.pico is None else max(self.pico, rss)
+            self._parar.wait(self.intervalo)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+
+def _preparar_ambiente(linhas, seed, backend, diretorio):
+    """Planilha sintética como fonte local e snapshots num diretório temporário (antes de importar o app)."""
+    fonte = os.path.join(diretorio, 'planilha.csv')
+    generate_sheet(linhas, seed=seed).to_csv(fonte, index=False)
+    os.environ['DASHBOARD_DATA_FILE'] = fonte
+    os.environ['DASHBOARD_SNAPSHOT_DIR'] = os.path.join(diretorio, 'snapshots')
+    os.environ['DASHBOARD_BACKEND'] = backend
+
+# ==============================================================================
+# SESSÕES
+# ==============================================================================
+@contextmanager
+def _appteste_concorrente():
+    """
+    O AppTest foi feito para uma sessão por vez: cada run cria um Runtime falso
+    global, liga a opção "global.appTest" e desfaz as duas coisas no fim. Com
+    sessões em threads, o fim de um run apagaria o Runtime (e os valores dos
+    widgets) dos runs ainda em andamento. Durante o teste de carga a opção fica
+    ligada e o primeiro Runtime criado continua valendo entre os runs.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1.util import patch_config_options
+
+    originais = Runtime.__dict__['instance'], Runtime.__dict__['exists']
+    vigente = []
+
+    def instance(cls):
+        if cls._instance is not None and not vigente:
+            vigente.append(cls._instance)
+        return vigente[0] if vigente else originais[0].__func__(cls)
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or bool(vigente))
+    try:
+        with patch_config_options({"global.appTest": True}):
+            yield
+    finally:
+        Runtime.instance, Runtime.exists = originais
+
+def _widget(lista, rotulo):
+    return next(w for w in lista if w.label == rotulo)
+
+def _acao(at, rng, secoes):
+    """Aplica uma interação aleatória de supervisor (sem rodar o app) e devolve o nome dela."""
+    tipo = rng.choice(['periodo', 'setores', 'analistas', 'secao'])
+    if tipo == 'periodo':
+        datas = at.sidebar.date_input[0]
+        inicio, fim = (np.datetime64(d.replace('/', '-')).astype(object) for d in (datas.proto.min, datas.proto.max))
+        fim = max(inicio, fim - timedelta(days=int(rng.integers(0, 5))))
+        dias = int(rng.choice([0, 6, 29]))
+        datas.set_value((max(inicio, fim - timedelta(days=dias)), fim))
+    elif tipo == 'setores':
+        setores = _widget(at.sidebar.multiselect, "Setores")
+        setores.set_value([] if rng.random() < 0.5 else [rng.choice(setores.options)])
+    elif tipo == 'analistas':
+        analistas = _widget(at.sidebar.multiselect, "Analistas")
+        n = int(rng.integers(0, 4))
+        analistas.set_value(list(rng.choice(analistas.options, size=min(n, len(analistas.options)), replace=False)))
+    else:
+        at.get('button_group')[0].set_value(secoes[int(rng.integers(len(secoes)))])
+    return str(tipo)
+
+def _sessao(indice, acoes, pausa, seed, barreira, saida):
+    from streamlit.testing.v1 import AppTest
+    from modules.ui_components import SECOES
+
+    rng = np.random.default_rng(seed + indice)
+    registro = {'latencias': [], 'erros': []}
+    saida[indice] = registro
+    try:
+        at = AppTest.from_file(APP, default_timeout=300)
+        at.run()
+        barreira.wait()
+        for _ in range(acoes):
+            _acao(at, rng, SECOES)
+            inicio = time.perf_counter()
+            at.run()
+            registro['latencias'].append(time.perf_counter() - inicio)
+            registro['erros'].extend(str(e.value) for e in at.exception)
+            if pausa:
+                time.sleep(pausa * rng.random() * 2)
+    except Exception as e:
+        registro['erros'].append(repr(e))
+        barreira.abort()
+
+def run_carga(n_sessoes, acoes, pausa=0.0, seed=42):
+    """Roda `n_sessoes` sessões simultâneas, cada uma com `acoes` interações, e resume as latências."""
+    saida = {}
+    barreira = threading.Barrier(n_sessoes + 1)
+    threads = [
+        threading.Thread(target=_sessao, args=(i, acoes, pausa, seed, barreira, saida), name=f"sessao-{i}")
+        for i in range(n_sessoes)
+    ]
+    for t in threads:
+        t.start()
+    try:
+        barreira.wait()   # Todas as sessões abertas: a medição começa junto
+    except threading.BrokenBarrierError:
+        pass
+    with _AmostradorMemoria() as memoria:
+        inicio = time.perf_counter()
+        for t in threads:
+            t.join()
+        duracao = time.perf_counter() - inicio
+
+    latencias = np.array([x for r in saida.values() for x in r['latencias']]) * 1000
+    erros = [e for r in saida.values() for e in r['erros']]
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) if len(latencias) else (None, None, None)
+    return {
+        'sessoes': n_sessoes,
+        'reruns': int(len(latencias)),
+        'p50_ms': None if p50 is None else float(p50),
+        'p95_ms': None if p95 is None else float(p95),
+        'p99_ms': None if p99 is None else float(p99),
+        'max_ms': float(latencias.max()) if len(latencias) else None,
+        'reruns_por_s': len(latencias) / duracao if duracao > 0 else None,
+        'duracao_s': duracao,
+        'rss_mb': _rss_mb(),
+        'rss_pico_mb': memoria.pico,
+        'erros': len(erros),
+        'exemplos_erro': sorted(set(erros))[:3],
+    }
+
+def run(sessoes, acoes, pausa=0.0, seed=42):
+    resultados = []
+    print(f"{'sessões':>8} {'reruns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'reruns/s':>9} {'RSS MB':>8} {'erros':>6}")
+    for n in sessoes:
+        r = run_carga(n, acoes, pausa, seed)
+        resultados.append(r)
+        fmt = lambda v, casas=1: '—' if v is None else f"{v:.{casas}f}"
+        print(f"{n:>8} {r['reruns']:>7} {fmt(r['p50_ms']):>9} {fmt(r['p95_ms']):>9} {fmt(r['p99_ms']):>9} "
+              f"{fmt(r['reruns_por_s']):>9} {fmt(r['rss_pico_mb'], 0):>8} {r['erros']:>6}")
+    return resultados
+
+def comparar(atual, anterior, tolerancia):
+    """Compara o p95 com uma execução anterior; retorna as quantidades de sessões que pioraram além da tolerância."""
+    base = {r['sessoes']: r for r in anterior['resultados']}
+    regressoes = []
+    print(f"\n{'sessões':>8} {'p95 antes':>10} {'p95 agora':>10} {'razão':>7}")
+    for r in atual:
+        ref = base.get(r['sessoes'])
+        if ref is None or not ref.get('p95_ms') or r['p95_ms'] is None:
+            continue
+        razao = r['p95_ms'] / ref['p95_ms']
+        marca = ' <-- regressão' if razao > tolerancia else ''
+        print(f"{r['sessoes']:>8} {ref['p95_ms']:>10.1f} {r['p95_ms']:>10.1f} {razao:>7.2f}{marca}")
+        if razao > tolerancia:
+            regressoes.append(r['sessoes'])
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do dashboard com sessões simultâneas.")
+    parser.add_argument('--sessoes', type=int, nargs='+', default=[1, 2, 4, 8, 16], help="Quantidades de sessões simultâneas.")
+    parser.add_argument('--acoes', type=int, default=20, help="Interações (reruns) por sessão.")
+    parser.add_argument('--pausa', type=float, default=0.0, help="Pausa média entre interações de uma sessão (s).")
+    parser.add_argument('--linhas', type=int, default=100_000, help="Tamanho da planilha sintética.")
+    parser.add_argument('--backend', choices=['pandas', 'duckdb'], default='pandas')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--saida', default='carga_resultados.json', help="Arquivo JSON de resultados.")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões.")
+    parser.add_argument('--tolerancia', type=float, default=1.2, help="Razão de p95 acima da qual há regressão.")
+    args = parser.parse_args(argv)
+
+    saida = os.path.abspath(args.saida)
+    with tempfile.TemporaryDirectory() as diretorio:
+        _preparar_ambiente(args.linhas, args.seed, args.backend, diretorio)
+        os.chdir(RAIZ)  # O app lê modules/styles.css por caminho relativo
+        with _appteste_concorrente():
+            resultados = run(args.sessoes, args.acoes, args.pausa, args.seed)
+
+    config = {k: getattr(args, k) for k in ('acoes', 'pausa', 'linhas', 'backend', 'seed')}
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump({'metadados': {**_metadados(), 'configuracao': config}, 'resultados': resultados}, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados gravados em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia)
+        if regressoes:
+            print(f"\nRegressões com {', '.join(map(str, regressoes))} sessões")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
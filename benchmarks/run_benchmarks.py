@@ -0,0 +1,173 @@
+"""
+Benchmark do pipeline de dados do dashboard (sem Streamlit e sem rede).
+
+Uso:
+    python -m benchmarks.run_benchmarks --linhas 10000 100000 1000000 --saida resultados.json
+    python -m benchmarks.run_benchmarks --linhas 100000 --comparar resultados_anteriores.json
+
+Para cada tamanho de planilha sintética mede, por etapa, o tempo de parede
+(mediana e mínimo de `--repeticoes` execuções) e o pico de memória alocada
+(tracemalloc, em uma execução separada para não distorcer o tempo).
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generator import generate_sheet
+from modules import business_logic, filters, reincidencia, rollups, tma_sketch
+
+def _medir(fn, repeticoes):
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = fn()
+        tempos.append(time.perf_counter() - inicio)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, tempos, pico
+
+def _linhas(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, tuple):
+        return sum(_linhas(o) for o in obj if isinstance(o, (pd.DataFrame, pd.Series)))
+    return None
+
+def _etapas(raw):
+    """
+    Etapas medidas, na ordem em que o app as executa. O gerador só avança depois
+    que a etapa anterior foi medida, então cada uma usa o resultado das anteriores.
+    """
+    ctx = {}
+
+    def processar():
+        ctx['processado'] = business_logic.process_data(raw.copy())
+        return ctx['processado']
+
+    def cubo():
+        ctx['cubo'] = rollups.build_rollup(ctx['processado'])
+        return ctx['cubo']
+
+    def sketches():
+        ctx['sketches'] = tma_sketch.build_sketches(ctx['processado'])
+        return ctx['sketches']
+
+    def selecoes():
+        inicio, fim = filters.date_bounds(ctx['processado'])
+        setor = filters.filter_options(ctx['processado']['Setor'])[:1]
+        analistas = filters.filter_options(ctx['processado']['Colaborador'])[:3]
+        return {
+            'dia': filters.FilterSpec(fim, fim),
+            'semana': filters.FilterSpec(fim - timedelta(days=6), fim),
+            'mes_setor_analistas': filters.FilterSpec(max(inicio, fim - timedelta(days=30)), fim, tuple(setor), tuple(analistas)),
+            'mes': filters.FilterSpec(max(inicio, fim - timedelta(days=30)), fim),
+        }
+
+    yield 'process_data', processar
+    yield 'build_rollup', cubo
+    yield 'build_tma_sketches', sketches
+
+    for nome, filtro in selecoes().items():
+        yield f'filtro_{nome}', lambda f=filtro: f.apply(ctx['processado'])
+
+    mes = selecoes()['mes']
+    yield 'calculate_meta_logic_mes', lambda: business_logic.calculate_meta_logic(mes.apply(ctx['processado']), mes.end)
+    yield 'metas_cubo_mes', lambda: rollups.metas(mes.apply(ctx['cubo']))
+    yield 'kpis_cubo_mes', lambda: rollups.kpis(mes.apply(ctx['cubo']))
+    yield 'tma_percentis_mes', lambda: tma_sketch.percentis_colaborador(mes.apply(ctx['sketches']))
+    yield 'pedidos_resumo_mes', lambda: reincidencia.resumo_pedidos(mes.apply(ctx['processado']))
+    yield 'pedidos_reincidencia_mes', lambda: reincidencia.tabela_reincidencia(mes.apply(ctx['processado']))
+    yield 'pedidos_portal_motivo_mes', lambda: (
+        rollups.volume_portal(mes.apply(ctx['cubo'])), rollups.volume_portal_motivo(mes.apply(ctx['cubo']))
+    )
+
+def run(tamanhos, repeticoes=3, seed=42):
+    resultados = []
+    for n in tamanhos:
+        raw = generate_sheet(n, seed=seed)
+        print(f"\n== {n:,} linhas ==")
+        for etapa, fn in _etapas(raw):
+            saida, tempos, pico = _medir(fn, repeticoes)
+            registro = {
+                'linhas': n,
+                'etapa': etapa,
+                'tempo_s': statistics.median(tempos),
+                'tempo_min_s': min(tempos),
+                'pico_mb': pico / 1e6,
+                'linhas_saida': _linhas(saida),
+            }
+            resultados.append(registro)
+            print(f"  {etapa:<28} {registro['tempo_s'] * 1000:>10.1f} ms {registro['pico_mb']:>10.1f} MB")
+        del raw
+    return resultados
+
+def _metadados():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=False).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'data_execucao': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit or None,
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+    }
+
+def comparar(atual, anterior, tolerancia):
+    """Compara tempos com uma execução anterior; retorna as etapas que pioraram além da tolerância."""
+    base = {(r['linhas'], r['etapa']): r for r in anterior['resultados']}
+    regressoes = []
+    print(f"\n{'linhas':>10} {'etapa':<28} {'antes ms':>10} {'agora ms':>10} {'razão':>7}")
+    for r in atual:
+        ref = base.get((r['linhas'], r['etapa']))
+        if ref is None:
+            continue
+        razao = r['tempo_s'] / ref['tempo_s'] if ref['tempo_s'] > 0 else float('inf')
+        marca = ' <-- regressão' if razao > tolerancia else ''
+        print(f"{r['linhas']:>10,} {r['etapa']:<28} {ref['tempo_s'] * 1000:>10.1f} {r['tempo_s'] * 1000:>10.1f} {razao:>7.2f}{marca}")
+        if razao > tolerancia:
+            regressoes.append(r['etapa'])
+    return regressoes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de dados do dashboard.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help="Tamanhos da planilha sintética.")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--saida', default='benchmark_resultados.json', help="Arquivo JSON de resultados.")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para detectar regressões.")
+    parser.add_argument('--tolerancia', type=float, default=1.2, help="Razão de tempo acima da qual a etapa é regressão.")
+    args = parser.parse_args(argv)
+
+    resultados = run(args.linhas, args.repeticoes, args.seed)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump({'metadados': _metadados(), 'resultados': resultados}, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regressoes = comparar(resultados, json.load(f), args.tolerancia)
+        if regressoes:
+            print(f"\nRegressões: {', '.join(regressoes)}")
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
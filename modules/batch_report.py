@@ -0,0 +1,160 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from modules import business_logic, filters, metrics, query_engine, rollups, snapshot_store, tma_sketch
+from modules.cache import fingerprint_frame
+from modules.episode_engine import process_data_chunked
+
+# Relatório em lote: calcula as métricas do dashboard para vários períodos
+# (ex.: todos os dias do último ano) sem abrir o Streamlit.
+#
+#   python -m modules.batch_report --periodo dia --inicio 2025-01-01 --fim 2025-12-31 --saida relatorio.json
+#   python -m modules.batch_report --arquivo planilha.csv --periodo mes --workers 4
+#
+# A base processada é lida de um snapshot Arrow; cada processo do pool mapeia o
+# mesmo arquivo em memória e monta o cubo e os sketches de TMA uma única vez. Com
+# --arquivo, a planilha é processada em blocos (memória limitada ao bloco) antes
+# de gravar o snapshot. Sem --arquivo vale o snapshot "processed" do app; no modo
+# incremental e no backend duckdb o app não o grava, e a base sai do Parquet de
+# consulta, do snapshot "clean" ou do "raw" (o que houver).
+
+PERIODOS = ('dia', 'semana', 'mes')
+
+# Estado de cada processo do pool (preenchido pelo inicializador)
+_BASE = {}
+
+def _init_worker(nome, base_dir):
+    df = snapshot_store.load_snapshot(nome, base_dir)
+    _BASE['df'] = df
+    _BASE['cubo'] = rollups.build_rollup(df)
+    _BASE['sketches'] = tma_sketch.build_sketches(df)
+
+def _run_period(filtro):
+    return metrics.compute_metrics(_BASE['df'], filtro, cubo=_BASE['cubo'], sketches=_BASE['sketches'])
+
+def build_periods(inicio, fim, periodo='dia', setores=(), analistas=()):
+    """Lista de FilterSpec cobrindo [inicio, fim] em dias, semanas (seg-dom) ou meses."""
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período inválido: {periodo!r} (use {', '.join(PERIODOS)})")
+    inicio, fim = pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize()
+    if periodo == 'dia':
+        inicios = pd.date_range(inicio, fim, freq='D')
+        fins = inicios
+    elif periodo == 'semana':
+        inicios = pd.date_range(inicio - pd.Timedelta(days=inicio.dayofweek), fim, freq='W-MON')
+        fins = inicios + pd.Timedelta(days=6)
+    else:
+        inicios = pd.date_range(inicio.replace(day=1), fim, freq='MS')
+        fins = inicios + pd.offsets.MonthEnd(0)
+    return [
+        filters.FilterSpec(max(i, inicio).date(), min(f, fim).date(), tuple(setores), tuple(analistas))
+        for i, f in zip(inicios, fins)
+    ]
+
+def _app_base(base_dir):
+    """
+    Base processada a partir dos outros snapshots do app, quando não há o "processed":
+    Parquet de consulta mais recente (backend duckdb, já processado), "clean" (modo
+    incremental, só faltam as regras de episódio/TMA) ou "raw". None se não houver nenhum.
+    """
+    parquets = sorted(glob.glob(snapshot_store.parquet_path(f"{query_engine.PREFIXO_PARQUET}-*", base_dir)), key=os.path.getmtime)
+    if parquets:
+        df = pd.read_parquet(parquets[-1])
+        df.attrs['versao'] = os.path.basename(parquets[-1])[len(query_engine.PREFIXO_PARQUET) + 1:-len(".parquet")]
+        return df
+    clean = snapshot_store.load_snapshot("clean", base_dir)
+    if clean is not None:
+        versao = (snapshot_store.load_snapshot_meta("clean", base_dir).get('ingestao') or {}).get('versao')
+        df = business_logic.apply_business_rules(clean)
+        df.attrs['versao'] = versao or fingerprint_frame(df)
+        return df
+    raw = snapshot_store.load_snapshot("raw", base_dir)
+    if raw is not None:
+        versao = raw.attrs.get('versao')
+        df = business_logic.process_data(raw)
+        df.attrs['versao'] = versao or fingerprint_frame(df)
+        return df
+    return None
+
+def _prepare_snapshot(arquivo, base_dir, chunk_linhas=200_000):
+    """
+    Snapshot processado usado pelos workers: o do app (padrão), um temporário montado
+    dos outros snapshots do app (ver _app_base) ou um temporário a partir de `arquivo`.
+    """
+    if arquivo is None:
+        if snapshot_store.load_snapshot_meta("processed", base_dir) is not None:
+            return "processed", base_dir
+        df = _app_base(base_dir)
+        if df is None:
+            raise FileNotFoundError(
+                f"Nenhum snapshot do app em {base_dir or snapshot_store.SNAPSHOT_DIR} (processed, consulta-*.parquet, "
+                "clean ou raw); rode o app uma vez com esse diretório de snapshots ou use --arquivo."
+            )
+    else:
+        df = process_data_chunked(snapshot_store.iter_local_source(arquivo, chunk_linhas))
+        df.attrs['versao'] = fingerprint_frame(df)
+    tmp_dir = tempfile.mkdtemp(prefix="batch_report_")
+    snapshot_store.save_snapshot(df, "processed", tmp_dir)
+    return "processed", tmp_dir
+
+def run(periodos, nome, base_dir, workers=None):
+    """Calcula as métricas de cada período em um pool de processos (na ordem de `periodos`)."""
+    if workers == 1:
+        _init_worker(nome, base_dir)
+        return [_run_period(p) for p in periodos]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(nome, base_dir)) as pool:
+        return list(pool.map(_run_period, periodos, chunksize=max(1, len(periodos) // (4 * (workers or os.cpu_count() or 1)))))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Métricas do dashboard por período, sem Streamlit.")
+    parser.add_argument('--arquivo', help="Planilha local (csv/xlsx/parquet). Padrão: snapshots do app.")
+    parser.add_argument('--chunk-linhas', type=int, default=200_000, help="Linhas por bloco ao processar --arquivo.")
+    parser.add_argument('--snapshots', default=None, help="Diretório dos snapshots (padrão: DASHBOARD_SNAPSHOT_DIR).")
+    parser.add_argument('--periodo', choices=PERIODOS, default='dia')
+    parser.add_argument('--inicio', help="Data inicial (AAAA-MM-DD). Padrão: 365 dias antes do fim.")
+    parser.add_argument('--fim', help="Data final (AAAA-MM-DD). Padrão: última data da base.")
+    parser.add_argument('--setores', nargs='*', default=[])
+    parser.add_argument('--analistas', nargs='*', default=[])
+    parser.add_argument('--workers', type=int, default=None, help="Processos do pool (padrão: nº de CPUs).")
+    parser.add_argument('--saida', default='relatorio_metricas.json')
+    args = parser.parse_args(argv)
+
+    inicio_execucao = time.perf_counter()
+    nome, base_dir = _prepare_snapshot(args.arquivo, args.snapshots, args.chunk_linhas)
+    meta = snapshot_store.load_snapshot_meta(nome, base_dir)
+
+    if args.fim is None or args.inicio is None:
+        df = snapshot_store.load_snapshot(nome, base_dir)
+        primeira, ultima = filters.date_bounds(df)
+        del df
+    fim = pd.Timestamp(args.fim) if args.fim else pd.Timestamp(ultima)
+    inicio = pd.Timestamp(args.inicio) if args.inicio else max(pd.Timestamp(primeira), fim - pd.Timedelta(days=364))
+
+    periodos = build_periods(inicio, fim, args.periodo, args.setores, args.analistas)
+    try:
+        resultados = run(periodos, nome, base_dir, args.workers)
+    finally:
+        if base_dir != args.snapshots:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump({
+            'gerado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'versao_dados': meta.get('versao'),
+            'periodo': args.periodo,
+            'resultados': resultados,
+        }, f, ensure_ascii=False)
+    print(f"{len(resultados)} períodos em {time.perf_counter() - inicio_execucao:.1f}s -> {args.saida}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
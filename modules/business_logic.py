@@ -1,111 +1,268 @@
 import pandas as pd
 import numpy as np
-from datetime import timedelta
+import pyarrow as pa
+import pyarrow.compute as pc
+from modules import parsing
+
+# Janela da regra de duplicidade e faixa de tempo considerada no TMA
+JANELA_DUPLICIDADE = pd.Timedelta(hours=2)
+TMA_MIN_MINUTOS = 0.5
+TMA_MAX_MINUTOS = 40
+
+# Parâmetros da jornada usados nas metas e na capacidade projetada
+JORNADA = {
+    'inicio_hora': 7.5,       # 07:30
+    'fim_hora': 17.3,         # 17:18
+    'fator_produtivo': 0.70,  # 30% Ociosidade
+    'tma_alvo_sac': 4.0,
+    'tma_alvo_pend': 4.33,
+}
 
 def process_data(df):
     """Realiza limpeza, tratamento e aplica regras de negócio."""
-    
-    # 1. Tratamento de Datas
-    df['Data'] = pd.to_datetime(df['Data'], dayfirst=True, errors='coerce')
-    df = df.dropna(subset=['Data'])
+    return apply_business_rules(clean_data(df))
+
+def clean_data(df):
+    """Limpeza e tratamento linha a linha (não depende das demais linhas da base)."""
 
-    # 2. Tratamento de Textos
+    # 1. Tratamento de Datas (formatos da planilha, uma conversão por valor distinto)
+    df['Data'] = parsing.parse_datas(df['Data'])
+    validas = df['Data'].notna()
+    if not validas.all():
+        df = df[validas]
+
+    # 2. Tratamento de Textos (uma vez por valor distinto; colunas ficam como Categorical)
     cols_texto = ['Colaborador', 'Setor', 'Portal', 'Transportadora', 'Motivo', 'Motivo_CRM', 'Numero_Pedido', 'Nota_Fiscal']
     for col in cols_texto:
         if col in df.columns:
-            df[col] = df[col].fillna("Não Informado").astype(str).replace("nan", "Não Informado").str.strip().str.replace(';', ',').str.replace('\n', ' ')
+            df[col] = map_distinct(
+                df[col],
+                lambda s: s.replace("nan", "Não Informado").str.strip().str.replace(';', ',').str.replace('\n', ' '),
+                na_value="Não Informado"
+            )
 
     # 3. Construção de Data/Hora Completa
+    # Hora malformada afeta só a própria linha (fica com a data, sem horário)
     if 'Hora' in df.columns:
-        df['Hora_Str'] = df['Hora'].astype(str)
-        df['Hora_Cheia'] = df['Hora_Str'].str.slice(0, 2) + ":00"
+        hora, df['Hora_Cheia'] = parsing.parse_horas(df['Hora'])
+        df['Data_Completa'] = parsing.combine_data_hora(df['Data'], hora)
     else:
+        # Sem coluna Hora, o horário (se houver) já vem na própria Data
         df['Hora_Cheia'] = df['Data'].dt.hour.astype(str).str.zfill(2) + ":00"
-        df['Hora_Str'] = df['Data'].dt.strftime('%H:%M:%S')
-
-    try:
-        df['Data_Completa'] = df['Data'] + pd.to_timedelta(df['Hora_Str'])
-    except:
         df['Data_Completa'] = df['Data']
 
     if 'Dia_Semana' in df.columns:
-        df['Dia_Semana'] = df['Dia_Semana'].astype(str).str.title().str.strip()
+        df['Dia_Semana'] = map_distinct(df['Dia_Semana'], lambda s: s.str.title().str.strip(), na_value="Nan")
+
+    # 4. IDs de Referência (Pedido ou, na falta dele, Nota Fiscal)
+    df['ID_Ref'] = coalesce_categorical(df['Numero_Pedido'], df['Nota_Fiscal'], "Não Informado")
+
+    return df
+
+def display_column(df, nome):
+    """
+    Colunas só de exibição/agrupamento, criadas sob demanda para as linhas de `df`
+    (em geral já filtradas) em vez de ocuparem a base processada inteira:
+    Data_Str ("31/12/2024") e Hora_Str (texto original da Hora).
+    """
+    if nome == 'Data_Str':
+        s = parsing.format_datas(df['Data'], '%d/%m/%Y')
+    elif nome == 'Hora_Str':
+        s = df['Hora'].astype(str) if 'Hora' in df.columns else parsing.format_datas(df['Data'], '%H:%M:%S')
+    else:
+        raise KeyError(nome)
+    return s.rename(nome)
 
-    # 4. IDs de Referência
-    df['ID_Ref'] = np.where(df['Numero_Pedido'] != "Não Informado", df['Numero_Pedido'], df['Nota_Fiscal'])
-    df['ID_Ref'] = df['ID_Ref'].astype(str)
-    df['Data_Str'] = df['Data'].dt.strftime('%d/%m/%Y')
+def map_distinct(s, fn, na_value):
+    """
+    Aplica `fn` (operações .str sobre uma Series de texto) uma única vez por valor
+    distinto de `s` e devolve o resultado como Categorical. Vazios viram `na_value`.
+    """
+    codes, uniques = pd.factorize(s)
+    if not isinstance(uniques.dtype, pd.StringDtype):
+        uniques = np.asarray(uniques, dtype=object)  # Valores mistos (números, datas): str() de cada um
+    distintos = pd.Series(uniques).astype(str)
+    valores = fn(distintos)
+    # O `na_value` só vira categoria se houver vazios: categorias = valores presentes
+    if (codes < 0).any():
+        valores = pd.concat([valores, pd.Series([na_value], dtype=valores.dtype)], ignore_index=True)
+    # Valores distintos podem coincidir após a limpeza (ex.: "SAC" e " SAC").
+    # Categorias ordenadas: ordenar pelo código equivale a ordenar pelo texto.
+    novos_codes, categorias = pd.factorize(valores, sort=True)
+    # O código -1 (vazio) aponta para o último elemento, que é o `na_value`
+    return pd.Categorical.from_codes(novos_codes[codes], categories=categorias)
+
+def coalesce_categorical(principal, alternativa, vazio):
+    """Usa `principal` e, onde ele for `vazio`, `alternativa` (tudo no espaço de códigos)."""
+    principal = principal.astype('category')
+    alternativa = alternativa.astype('category')
+    # União ordenada das categorias e posição de cada uma nela calculadas no Arrow,
+    # sem materializar as centenas de milhares de textos (pedidos/NFs) como objetos
+    cat_principal = pa.array(principal.cat.categories)
+    cat_alternativa = pa.array(alternativa.cat.categories)
+    uniao = pc.unique(pa.concat_arrays([cat_principal, cat_alternativa]))
+    uniao = uniao.take(pc.sort_indices(uniao))
+    cod_principal = pc.index_in(cat_principal, value_set=uniao).to_numpy()[principal.cat.codes.to_numpy()]
+    cod_alternativa = pc.index_in(cat_alternativa, value_set=uniao).to_numpy()[alternativa.cat.codes.to_numpy()]
+    cod_vazio = principal.cat.categories.get_indexer([vazio])[0]
+    eh_vazio = (principal.cat.codes.to_numpy() == cod_vazio) & (cod_vazio >= 0)
+    codes = np.where(eh_vazio, cod_alternativa, cod_principal)
+    categorias = pd.Index(pd.array(uniao, dtype=principal.cat.categories.dtype))
+    return pd.Categorical.from_codes(codes, categories=categorias)
+
+def contains_upper(s, texto):
+    """Equivale a `s.astype(str).str.upper().str.contains(texto)`, calculado por categoria quando possível."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        por_categoria = np.append(
+            np.asarray(s.cat.categories.astype(str).str.upper().str.contains(texto), dtype=bool),
+            False
+        )
+        return pd.Series(por_categoria[s.cat.codes.to_numpy()], index=s.index)
+    return s.astype(str).str.upper().str.contains(texto, na=False)
+
+def concat_frames(frames):
+    """pd.concat que preserva as colunas categóricas, unindo as categorias (em vez de virar object)."""
+    frames = [f for f in frames if f is not None]
+    colunas_cat = [
+        c for c in frames[0].columns
+        if isinstance(frames[0][c].dtype, pd.CategoricalDtype) and all(c in f for f in frames)
+    ]
+    if len(frames) > 1 and colunas_cat:
+        alinhados = [f.copy(deep=False) for f in frames]
+        for c in colunas_cat:
+            categorias = frames[0][c].cat.categories
+            for f in frames[1:]:
+                categorias = categorias.append(f[c].astype('category').cat.categories).unique()
+            categorias = categorias.sort_values()
+            for f in alinhados:
+                f[c] = f[c].astype('category').cat.set_categories(categorias)
+        frames = alinhados
+    return pd.concat(frames)
+
+def apply_business_rules(df):
+    """Regras que dependem do histórico: duplicidade (episódios) e TMA."""
+
+    # Nenhuma cópia ordenada da base: cada regra ordena só os arrays de que precisa
+    # (argsort estável, empates de horário mantêm a ordem da planilha), grava o
+    # resultado na ordem original e a base é reordenada uma única vez no fim.
+    chave_tempo = _chave_ordenacao(df['Data_Completa'])
 
     # ==============================================================================
     # REGRA DE NEGÓCIO: DUPLICIDADE (COM EXCEÇÕES SOLICITADAS)
     # ==============================================================================
-    df = df.sort_values(by=['ID_Ref', 'Data_Completa'])
-    df['Tempo_Desde_Ultimo_Contato'] = df.groupby('ID_Ref')['Data_Completa'].diff()
+    df['Tempo_Desde_Ultimo_Contato'] = diff_por_grupo(df['ID_Ref'], df['Data_Completa'], chave_tempo)
+    df['Eh_Novo_Episodio'] = flag_novo_episodio(df, df['Tempo_Desde_Ultimo_Contato'])
+
+    # ==============================================================================
+    # CÁLCULO DE TMA
+    # ==============================================================================
+    # Próximo contato do mesmo colaborador em ordem cronológica
+    df['Tempo_Ate_Proximo'] = diff_por_grupo(df['Colaborador'], df['Data_Completa'], chave_tempo, proximo=True)
+    df['Minutos_No_Atendimento'], df['TMA_Valido'] = calc_tma(df['Tempo_Ate_Proximo'])
 
-    # Flags de verificação
-    is_sac = df['Setor'].astype(str).str.upper().str.contains('SAC', na=False)
-    is_sem_nf = df['Nota_Fiscal'].astype(str).str.upper().str.contains('SEM NF', na=False)
-    is_reclame_aqui = df['Motivo'].astype(str).str.upper().str.contains('RECLAME AQUI', na=False)
+    # Ordem final: Data, Data_Completa e, nos empates, a ordem da planilha
+    ordem = np.lexsort((chave_tempo, _chave_ordenacao(df['Data'])))
+    if (ordem[1:] < ordem[:-1]).any():
+        df = df.take(ordem)
+    return df
+
+def _chave_ordenacao(datas):
+    """Datas como int64 para argsort, com NaT no fim (como no sort_values)."""
+    chave = datas.to_numpy().view('i8')
+    vazias = np.isnat(datas.to_numpy())
+    if vazias.any():
+        chave = np.where(vazias, np.iinfo(np.int64).max, chave)
+    return chave
+
+def diff_por_grupo(grupos, tempos, chave_tempo, proximo=False):
+    """
+    Tempo desde o contato anterior do mesmo grupo (ou, com `proximo`, até o contato
+    seguinte), na ordem estável (grupo, tempo). Equivale a `groupby(grupo).diff()`
+    (ou `shift(-1) - tempo`) sobre a base ordenada, mas só permuta os códigos do
+    Categorical e os horários; o resultado volta alinhado à ordem original.
+    """
+    codes = grupos.astype('category').cat.codes.to_numpy()
+    ordem = np.lexsort((chave_tempo, codes))
+    codes = codes[ordem]
+    valores = tempos.to_numpy()[ordem]
+
+    passo = valores[1:] - valores[:-1]
+    passo[(codes[1:] != codes[:-1]) | (codes[1:] < 0)] = np.timedelta64('NaT')
+    ordenado = np.empty(len(ordem), dtype=passo.dtype)
+    if proximo:
+        ordenado[:-1], ordenado[-1:] = passo, np.timedelta64('NaT')
+    else:
+        ordenado[1:], ordenado[:1] = passo, np.timedelta64('NaT')
+
+    resultado = np.empty_like(ordenado)
+    resultado[ordem] = ordenado
+    return pd.Series(resultado, index=grupos.index)
+
+def sort_by_data(df):
+    """Garante a base ordenada por Data, pré-requisito do filtro de período por busca binária."""
+    if not df['Data'].is_monotonic_increasing:
+        df = df.sort_values(by='Data', kind='stable')
+    return df
+
+def flag_novo_episodio(df, tempo_desde_ultimo):
+    """Marca 1 para contatos que contam como novo episódio, 0 para duplicidades."""
+    # Flags de verificação (calculadas por categoria e mapeadas pelos códigos)
+    is_sac = contains_upper(df['Setor'], 'SAC')
+    is_sem_nf = contains_upper(df['Nota_Fiscal'], 'SEM NF')
+    is_reclame_aqui = contains_upper(df['Motivo'], 'RECLAME AQUI')
 
     # Condição padrão: Passou 2 horas ou é o primeiro contato
-    condicao_padrao_tempo = (df['Tempo_Desde_Ultimo_Contato'].isnull()) | (df['Tempo_Desde_Ultimo_Contato'] > pd.Timedelta(hours=2))
+    condicao_padrao_tempo = (tempo_desde_ultimo.isnull()) | (tempo_desde_ultimo > JANELA_DUPLICIDADE)
 
     # APLICAÇÃO DA LÓGICA DE EXCEÇÃO:
     # Conta como Novo Episódio (Produtividade) se:
     # 1. Regra de tempo padrão for atendida
     # 2. OU se for SAC e a nota for "SEM NF"
     # 3. OU se for SAC e o motivo for "RECLAME AQUI"
-    df['Eh_Novo_Episodio'] = np.where(
-        condicao_padrao_tempo | (is_sac & is_sem_nf) | (is_sac & is_reclame_aqui), 
-        1, 
+    return np.where(
+        condicao_padrao_tempo | (is_sac & is_sem_nf) | (is_sac & is_reclame_aqui),
+        1,
         0
     )
 
-    # ==============================================================================
-    # CÁLCULO DE TMA
-    # ==============================================================================
-    df = df.sort_values(by=['Colaborador', 'Data_Completa'])
-    df['Tempo_Ate_Proximo'] = df.groupby('Colaborador')['Data_Completa'].shift(-1) - df['Data_Completa']
-    df['Minutos_No_Atendimento'] = df['Tempo_Ate_Proximo'].dt.total_seconds() / 60
-    
-    df['TMA_Valido'] = np.where(
-        (df['Minutos_No_Atendimento'] > 0.5) & (df['Minutos_No_Atendimento'] <= 40),
-        df['Minutos_No_Atendimento'],
+def calc_tma(tempo_ate_proximo):
+    """Minutos até o próximo contato do colaborador e TMA válido (entre 0,5 e 40 min)."""
+    minutos = tempo_ate_proximo.dt.total_seconds() / 60
+    tma_valido = np.where(
+        (minutos > TMA_MIN_MINUTOS) & (minutos <= TMA_MAX_MINUTOS),
+        minutos,
         np.nan
     )
+    return minutos, tma_valido
 
-    return df
-
-def calculate_meta_logic(df_filtered, end_date):
+def calculate_meta_logic(df_filtered, end_date, jornada=JORNADA):
     """Calcula as metas dinâmicas de SAC e Pendência."""
-    # Constantes
-    TMA_TARGET_SAC = 4.0
-    TMA_TARGET_PEND = 4.33
-    FIM_JORNADA_HORA = 17.3 # 17:18
-
     # Identifica Hora de Chegada
-    df_presenca = df_filtered.groupby(['Colaborador', 'Data_Str', 'Setor'])['Data_Completa'].min().reset_index()
+    data_str = display_column(df_filtered, 'Data_Str')
+    df_presenca = df_filtered.groupby(['Colaborador', data_str, 'Setor'], observed=True)['Data_Completa'].min().reset_index()
     df_presenca.rename(columns={'Data_Completa': 'Hora_Entrada'}, inplace=True)
+    return compute_metas(df_presenca, jornada)
 
-    def _calc_row(row):
-        hora_entrada = row['Hora_Entrada'].hour + (row['Hora_Entrada'].minute / 60)
-        hora_inicio_valida = max(7.5, hora_entrada) # 07:30
-        
-        horas_disponiveis = FIM_JORNADA_HORA - hora_inicio_valida
-        if horas_disponiveis <= 0: return 0, 0
-        
-        minutos_uteis = (horas_disponiveis * 60) * 0.70 # 30% Ociosidade
-        
-        setor_str = str(row['Setor']).upper()
-        tma_alvo = TMA_TARGET_SAC 
-        if 'PEND' in setor_str or 'ÊNCIA' in setor_str:
-            tma_alvo = TMA_TARGET_PEND
-        
-        meta = int(minutos_uteis / tma_alvo)
-        return (meta, 0) if tma_alvo == TMA_TARGET_SAC else (0, meta)
-
-    metas = df_presenca.apply(_calc_row, axis=1)
-    df_presenca['Meta_SAC'] = [x[0] for x in metas]
-    df_presenca['Meta_PEND'] = [x[1] for x in metas]
+def compute_metas(df_presenca, jornada=JORNADA):
+    """Metas por linha de presença (Colaborador, dia, Setor, Hora_Entrada)."""
+    entrada = df_presenca['Hora_Entrada']
+    hora_entrada = entrada.dt.hour + (entrada.dt.minute / 60)
+    hora_inicio_valida = np.maximum(jornada['inicio_hora'], hora_entrada)  # 07:30
+
+    horas_disponiveis = (jornada['fim_hora'] - hora_inicio_valida).to_numpy()
+    minutos_uteis = (horas_disponiveis * 60) * jornada['fator_produtivo']
+
+    setor = df_presenca['Setor']
+    is_pend = (contains_upper(setor, 'PEND') | contains_upper(setor, 'ÊNCIA')).to_numpy()
+    tma_alvo = np.where(is_pend, jornada['tma_alvo_pend'], jornada['tma_alvo_sac'])
+
+    # Sem horas disponíveis (chegou depois do fim da jornada) a meta é zero
+    meta = np.where(horas_disponiveis > 0, np.trunc(minutos_uteis / tma_alvo), 0).astype(int)
+    df_presenca['Meta_SAC'] = np.where(is_pend, 0, meta)
+    df_presenca['Meta_PEND'] = np.where(is_pend, meta, 0)
 
     return df_presenca
+
+def tempo_util_minutos(jornada=JORNADA):
+    """Minutos produtivos de uma jornada completa (07:30 às 17:18, descontada a ociosidade)."""
+    return (jornada['fim_hora'] - jornada['inicio_hora']) * 60 * jornada['fator_produtivo']
@@ -0,0 +1,112 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+def fingerprint_frame(df):
+    """Gera uma impressão digital do conteúdo do DataFrame (colunas + valores)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(list(df.columns)).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+def frame_nbytes(df):
+    """Memória ocupada pelo DataFrame, em bytes."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+class VersionedFrameCache:
+    """
+    Cache LRU thread-safe de DataFrames indexado pela versão dos dados.
+
+    Cada versão é calculada uma única vez, mesmo com várias sessões pedindo ao
+    mesmo tempo, e o resultado é compartilhado: quem recebe o DataFrame NÃO
+    deve modificá-lo. As versões mais antigas são descartadas quando o número
+    de entradas ou a memória total ultrapassam os limites.
+    """
+
+    def __init__(self, max_entries=3, max_bytes=1_500_000_000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # chave -> (valor, bytes)
+        self._pending = {}              # chave -> Lock do cálculo em andamento
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value, nbytes=None):
+        if nbytes is None:
+            nbytes = frame_nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self.total_bytes += nbytes
+            self._evict()
+
+    def get_or_compute(self, key, compute, sizeof=frame_nbytes):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            key_lock = self._pending.setdefault(key, threading.Lock())
+
+        # Apenas uma thread calcula cada versão; as demais aguardam o resultado
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self.hits += 1
+                    return self._entries[key][0]
+            try:
+                value = compute()
+                self.put(key, value, sizeof(value))
+                with self._lock:
+                    self.misses += 1
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+        return value
+
+    def resize(self, key, nbytes):
+        """Atualiza a memória de uma entrada que cresceu depois de guardada (ex.: View com novos resultados)."""
+        with self._lock:
+            if key not in self._entries:
+                return
+            value, antigo = self._entries[key]
+            self._entries[key] = (value, nbytes)
+            self.total_bytes += nbytes - antigo
+            self._evict()
+
+    def _evict(self):
+        # A entrada mais recente nunca é descartada, mesmo acima do limite
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.total_bytes -= nbytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'versoes': list(self._entries.keys()),
+                'entradas': len(self._entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,50 @@
+import pandas as pd
+import streamlit as st
+
+from modules.cache import VersionedFrameCache, fingerprint_frame
+from modules.views import result_nbytes
+
+# Cache de figuras Plotly (compartilhado entre sessões), chaveado pelo hash dos dados agregados
+MAX_FIGURAS = 64
+MAX_BYTES_FIGURAS = 200_000_000
+
+# Limite padrão de categorias (ex.: colaboradores) por gráfico; o excedente vira "Outros"
+MAX_CATEGORIAS = 30
+CHAVE_MAX_CATEGORIAS = "max_categorias_grafico"
+ROTULO_OUTROS = "Outros"
+
+@st.cache_resource
+def _figure_cache():
+    return VersionedFrameCache(max_entries=MAX_FIGURAS, max_bytes=MAX_BYTES_FIGURAS)
+
+def _figure_nbytes(dados):
+    # O JSON da figura cresce com os dados; estimativa sem serializar a figura
+    return 4 * result_nbytes(dados) + 20_000
+
+def cached_figure(nome, dados, build, *params):
+    """
+    Figura `build(dados)` reaproveitada enquanto os dados agregados (e `params`) forem
+    os mesmos. A figura é compartilhada entre sessões: `build` deve fazer todos os
+    ajustes (update_layout etc.) e quem a recebe não deve modificá-la.
+    """
+    chave = (nome, fingerprint_frame(dados), params)
+    return _figure_cache().get_or_compute(chave, lambda: build(dados), sizeof=lambda _: _figure_nbytes(dados))
+
+def max_categorias():
+    """Limite escolhido na sidebar (0 = sem limite)."""
+    return st.session_state.get(CHAVE_MAX_CATEGORIAS, MAX_CATEGORIAS)
+
+def top_n_outros(df, categoria, valores, n, agg='sum', rotulo=ROTULO_OUTROS):
+    """
+    Mantém as `n` categorias com maior `valores[0]` (em ordem decrescente) e junta as
+    demais em uma última linha "Outros (k)", agregada com `agg` ('sum' ou 'mean').
+    Com n <= 0 ou poucas categorias, devolve `df` sem alteração.
+    """
+    if not n or n <= 0 or len(df) <= n:
+        return df
+    ordenado = df.sort_values(valores[0], ascending=False, kind='stable')
+    topo, resto = ordenado.iloc[:n], ordenado.iloc[n:]
+    outros = resto[valores].agg(agg).to_frame().T
+    outros.insert(0, categoria, f"{rotulo} ({len(resto)})")
+    topo = topo[[categoria] + list(valores)].assign(**{categoria: topo[categoria].astype(str)})
+    return pd.concat([topo, outros], ignore_index=True)
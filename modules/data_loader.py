@@ -1,13 +1,381 @@
+import os
+import threading
+import time
 import streamlit as st
 import pandas as pd
 from streamlit_gsheets import GSheetsConnection
+from modules import business_logic, instrumentation, intraday, query_engine, rollups, sheets_loader, snapshot_store, tma_sketch
+from modules.incremental import IncrementalIngestor
+from modules.episode_engine import IncrementalProcessor
+from modules.refresher import BackgroundRefresher
+from modules.views import View
+from modules.cache import VersionedFrameCache, fingerprint_frame
 
-@st.cache_data(ttl=600)
-def get_raw_data():
-    """Conecta ao Google Sheets e retorna o DataFrame bruto."""
-    conn = st.connection("gsheets", type=GSheetsConnection)
+# Limites do cache de dados processados (compartilhado por todas as sessões)
+MAX_VERSOES_PROCESSADAS = 3
+MAX_BYTES_PROCESSADOS = 1_500_000_000
+
+# Limites do cache de seleções do painel (período/setores/analistas), compartilhado por
+# todas as sessões. Cada entrada é uma seleção com os resultados dos seus painéis:
+# ~3 seleções recentes por supervisor com 20 sessões, dentro do limite de memória.
+MAX_VISOES = 64
+MAX_BYTES_VISOES = 500_000_000
+
+# Snapshots locais: dentro deste prazo o snapshot é servido sem ir à rede.
+# É também o intervalo padrão da atualização em segundo plano.
+TTL_DADOS = 600
+SNAPSHOT_RAW = "raw"
+SNAPSHOT_PROCESSED = "processed"
+SNAPSHOT_CLEAN = "clean"
+
+def get_setting(name, default=None):
+    """Lê uma configuração da variável de ambiente DASHBOARD_<NAME> ou da seção [dashboard] do secrets.toml."""
+    env = os.environ.get(f"DASHBOARD_{name.upper()}")
+    if env:
+        return env
+    try:
+        return st.secrets["dashboard"][name]
+    except Exception:
+        return default
+
+def query_backend():
+    """
+    Onde rodam os filtros e agregações do painel: "pandas" (padrão, base processada em
+    memória) ou "duckdb" (Parquet local consultado sob demanda, ver query_engine).
+    """
+    return get_setting("backend", "pandas")
+
+def _lista(valor):
+    # Configuração em lista: "a, b" (variável de ambiente) ou lista do secrets.toml
+    if isinstance(valor, str):
+        return [v.strip() for v in valor.split(",") if v.strip()]
+    return list(valor)
+
+@st.cache_resource
+def _sheets_connection():
+    """Conexão compartilhada por todas as leituras: Google Sheets ou, com DASHBOARD_ABAS_LOCAL, pastas/arquivos locais."""
+    local = get_setting("abas_local")
+    if local:
+        return sheets_loader.LocalSheetsConnection(local, atraso=float(get_setting("abas_local_atraso", 0)))
+    return st.connection("gsheets", type=GSheetsConnection)
+
+@st.cache_resource
+def _fetch_report():
+    return {'abas': None}
+
+def fetch_worksheets(**read_kwargs):
+    """
+    Lê as abas configuradas em `abas` (padrão: Página1) em paralelo sobre a conexão
+    compartilhada e guarda o tempo de cada uma (ver get_data_status).
+    """
     try:
-        df = conn.read(worksheet="Página1")
-    except:
-        df = conn.read()
+        df, relatorio = sheets_loader.fetch_worksheets(
+            _sheets_connection(),
+            _lista(get_setting("abas", sheets_loader.ABAS_PADRAO)),
+            max_paralelas=int(get_setting("abas_paralelas", sheets_loader.MAX_PARALELAS)),
+            timeout=float(get_setting("abas_timeout", sheets_loader.TIMEOUT_ABA)),
+            tentativas=int(get_setting("abas_tentativas", sheets_loader.TENTATIVAS)),
+            **read_kwargs,
+        )
+    except sheets_loader.WorksheetError as e:
+        _fetch_report()['abas'] = e.relatorio
+        raise
+    _fetch_report()['abas'] = relatorio
     return df
+
+def fetch_raw_data():
+    """Busca os dados na fonte configurada: arquivo local (DASHBOARD_DATA_FILE) ou abas do Google Sheets."""
+    data_file = get_setting("data_file")
+    if data_file:
+        return snapshot_store.read_local_source(data_file)
+    # ttl=0: sem o cache interno da conexão (1 h); quem decide quando reler é o BackgroundRefresher
+    return fetch_worksheets(ttl=0)
+
+def _as_text(df):
+    """Converte todas as colunas para texto, preservando os vazios."""
+    return df.astype(str).where(df.notna(), None)
+
+def fetch_raw_rows(start=0):
+    """
+    Busca as linhas brutas a partir da posição `start` (0 = primeira linha de dados).
+    Tudo é lido como texto, para que leituras parciais e completas tenham os mesmos tipos.
+    Só com uma aba e conta de serviço a planilha entrega apenas as linhas novas (ver
+    sheets_loader.read_worksheet); no link público, com várias abas ou com arquivo
+    local a fonte inteira é lida e as linhas anteriores são descartadas.
+    """
+    data_file = get_setting("data_file")
+    if data_file:
+        if data_file.lower().endswith(".csv"):
+            return pd.read_csv(data_file, dtype=str, skiprows=range(1, start + 1) if start else None)
+        return _as_text(snapshot_store.read_local_source(data_file).iloc[start:])
+
+    if len(_lista(get_setting("abas", sheets_loader.ABAS_PADRAO))) == 1:
+        return fetch_worksheets(ttl=0, dtype=str, inicio=start)
+    # Com várias abas a posição é na base concatenada: as abas são relidas (em paralelo)
+    df = fetch_worksheets(ttl=0, dtype=str).iloc[start:]
+    return df.reset_index(drop=True)
+
+def ranged_source():
+    """Se `fetch_raw_rows` busca só as linhas novas na planilha (uma aba, conta de serviço)."""
+    if get_setting("data_file") or len(_lista(get_setting("abas", sheets_loader.ABAS_PADRAO))) != 1:
+        return False
+    return sheets_loader.supports_ranged_read(_sheets_connection())
+
+def get_raw_data(max_idade=TTL_DADOS, fallback=True):
+    """
+    Retorna (DataFrame bruto, time.time() da leitura da fonte). Serve o snapshot local
+    quando ele tem menos de `max_idade` segundos; com `fallback`, também quando a fonte falha.
+    """
+    meta = snapshot_store.load_snapshot_meta(SNAPSHOT_RAW)
+    if meta is not None and time.time() - meta.get("salvo_em", 0) < max_idade:
+        df = snapshot_store.load_snapshot(SNAPSHOT_RAW)
+        if df is not None:
+            return df, meta["salvo_em"]
+
+    try:
+        with instrumentation.stage("fetch_sheets") as etapa:
+            df = etapa.saida(fetch_raw_data())
+    except Exception:
+        # Sem acesso à fonte: usa o último snapshot disponível, se houver
+        df = snapshot_store.load_snapshot(SNAPSHOT_RAW) if fallback else None
+        if df is None:
+            raise
+        return df, (meta or {}).get("salvo_em")
+
+    # A versão acompanha o DataFrame para evitar recalcular o hash a cada rerun
+    df.attrs['versao'] = fingerprint_frame(df)
+    try:
+        snapshot_store.save_snapshot(df, SNAPSHOT_RAW)
+    except Exception:
+        pass  # O snapshot é uma otimização; falhar em gravá-lo não impede o uso
+    return df, time.time()
+
+@st.cache_resource
+def _processed_cache():
+    return VersionedFrameCache(max_entries=MAX_VERSOES_PROCESSADAS, max_bytes=MAX_BYTES_PROCESSADOS)
+
+def _load_or_process(df_raw, versao):
+    # Reaproveita o snapshot processado da mesma versão (ex.: após reiniciar o app)
+    meta = snapshot_store.load_snapshot_meta(SNAPSHOT_PROCESSED)
+    if meta is not None and meta.get('versao') == versao:
+        df = snapshot_store.load_snapshot(SNAPSHOT_PROCESSED)
+        if df is not None:
+            return df
+
+    df = _process(df_raw, versao)
+    try:
+        snapshot_store.save_snapshot(df, SNAPSHOT_PROCESSED)
+    except Exception:
+        pass
+    return df
+
+def _process(df_raw, versao):
+    with instrumentation.stage("process_data", df_raw) as etapa:
+        df = etapa.saida(business_logic.process_data(df_raw.copy()))
+    df.attrs['versao'] = versao
+    return df
+
+def get_processed_data(df_raw):
+    """
+    Retorna o DataFrame processado da versão atual dos dados.
+    O resultado é calculado uma vez por versão e compartilhado (somente leitura) entre sessões.
+    """
+    versao = df_raw.attrs.get('versao') or fingerprint_frame(df_raw)
+    return _processed_cache().get_or_compute(versao, lambda: _load_or_process(df_raw, versao))
+
+@st.cache_resource
+def _ingestor():
+    ingestor = IncrementalIngestor(fetch_raw_rows, modo=get_setting("modo_incremental", "linhas"))
+    # Retoma do último snapshot limpo, para não baixar o histórico inteiro ao reiniciar
+    meta = snapshot_store.load_snapshot_meta(SNAPSHOT_CLEAN)
+    if meta is not None and 'ingestao' in meta:
+        clean = snapshot_store.load_snapshot(SNAPSHOT_CLEAN)
+        if clean is not None:
+            ingestor.restore(clean, meta['ingestao'])
+    return ingestor
+
+@st.cache_resource
+def _incremental_processor():
+    return IncrementalProcessor()
+
+# Serializa sincronização + processamento incremental entre sessões
+_SYNC_LOCK = threading.Lock()
+
+def get_incremental_data(force=False):
+    """
+    Modo incremental: busca só as linhas novas da planilha desde a última sincronização,
+    limpa e aplica as regras de episódio/TMA apenas a essas linhas.
+    """
+    ingestor = _ingestor()
+    processor = _incremental_processor()
+    with _SYNC_LOCK:
+        versao_anterior = ingestor.versao
+        try:
+            with instrumentation.stage("fetch_sheets") as etapa:
+                clean, novo, completo = ingestor.sync() if force else ingestor.sync_if_due(TTL_DADOS)
+                etapa.saida(novo)
+        except Exception:
+            if ingestor.clean is None:
+                raise
+            clean, novo, completo = ingestor.clean, ingestor.clean.iloc[:0], False
+
+        versao = ingestor.versao
+        if len(novo):
+            try:
+                snapshot_store.save_snapshot(clean, SNAPSHOT_CLEAN, preserve_index=True, ingestao=ingestor.state())
+            except Exception:
+                pass
+
+        if processor.versao != versao:
+            # O lote só pode ser aplicado sobre a versão imediatamente anterior
+            with instrumentation.stage("process_data", novo) as etapa:
+                if completo or processor.processed is None or processor.versao != versao_anterior:
+                    df = processor.rebuild(clean, versao)
+                else:
+                    df = processor.append(novo, clean, versao)
+                etapa.saida(df)
+            df.attrs['versao'] = versao
+            _processed_cache().put(versao, df)
+
+    return processor.processed
+
+@st.cache_resource
+def _query_bases():
+    return VersionedFrameCache(max_entries=query_engine.MAX_VERSOES_PARQUET)
+
+def get_query_base(versao, produzir):
+    """
+    Base da versão `versao` consultável no DuckDB. Reaproveita o Parquet já exportado
+    (ex.: após reiniciar o app); senão exporta `produzir()`, a base processada, que
+    pode ser descartada em seguida.
+    """
+    def abrir():
+        base = query_engine.open_base(versao)
+        if base is None:
+            df = produzir()
+            with instrumentation.stage("exportar_parquet", df) as etapa:
+                base = etapa.saida(query_engine.export_base(df, versao))
+        return base
+    return _query_bases().get_or_compute(versao, abrir, sizeof=lambda base: 0)
+
+def _load_dashboard_data(force):
+    """
+    Carga usada pelo BackgroundRefresher: (base processada, momento da leitura da fonte).
+    Com o backend "duckdb" a base é uma query_engine.ParquetBase em vez do DataFrame.
+    """
+    usa_duckdb = query_backend() == "duckdb"
+    if get_setting("ingestao", "completa") == "incremental":
+        df = get_incremental_data(force=force)
+        obtido_em = _ingestor().ultimo_sync or time.time()
+        return (get_query_base(df.attrs['versao'], lambda: df) if usa_duckdb else df), obtido_em
+    df_raw, obtido_em = get_raw_data(max_idade=0 if force else TTL_DADOS, fallback=not force)
+    if usa_duckdb:
+        # As linhas processadas só existem durante a exportação; depois, só o Parquet
+        versao = df_raw.attrs.get('versao') or fingerprint_frame(df_raw)
+        return get_query_base(versao, lambda: _process(df_raw, versao)), obtido_em
+    return get_processed_data(df_raw), obtido_em
+
+@st.cache_resource
+def _refresher():
+    intervalo = float(get_setting("intervalo_atualizacao", TTL_DADOS))
+    return BackgroundRefresher(_load_dashboard_data, intervalo)
+
+def get_dashboard_data():
+    """
+    Ponto de entrada do app: DataFrame processado conforme o modo de ingestão configurado.
+    A atualização roda em segundo plano; até a troca, todos recebem a última versão boa.
+    """
+    return _refresher().current()
+
+def refresh_data(timeout=60):
+    """Pede uma atualização imediata (sem limpar os caches das outras sessões) e espera por ela."""
+    return _refresher().refresh(timeout)
+
+def get_data_status():
+    """
+    Idade dos dados, duração da última atualização, falha mais recente, se há uma em
+    andamento e o tempo de leitura de cada aba na última busca na planilha.
+    """
+    return {**_refresher().status(), 'abas': _fetch_report()['abas']}
+
+@st.cache_resource
+def _live_tracker():
+    # Ingestor próprio e sem acúmulo: o modo ao vivo só precisa das linhas novas,
+    # nunca da base processada (vale para os dois backends e modos de ingestão)
+    ingestor = IncrementalIngestor(fetch_raw_rows, modo=get_setting("modo_incremental", "linhas"), acumular=False)
+    return intraday.LiveTracker(ingestor)
+
+def get_live_rollup():
+    """
+    Cubo do dia corrente para o modo ao vivo (ver intraday): a planilha é relida a
+    cada `intervalo_ao_vivo` segundos e só as linhas novas atualizam os contadores.
+    Sem leitura por intervalo na fonte, cada leitura baixa a planilha inteira: o
+    padrão passa a ser INTERVALO_AO_VIVO_COMPLETO.
+    """
+    padrao = intraday.INTERVALO_AO_VIVO if ranged_source() else intraday.INTERVALO_AO_VIVO_COMPLETO
+    intervalo = float(get_setting("intervalo_ao_vivo", padrao))
+    with instrumentation.stage("ao_vivo") as etapa:
+        return etapa.saida(_live_tracker().atualizar(intervalo))
+
+def get_live_status():
+    return _live_tracker().status()
+
+@st.cache_resource
+def _rollup_cache():
+    return VersionedFrameCache(max_entries=MAX_VERSOES_PROCESSADAS, max_bytes=MAX_BYTES_PROCESSADOS // 4)
+
+def get_rollup(df_processed):
+    """Cubo de agregados da versão atual dos dados (calculado uma vez e compartilhado entre sessões)."""
+    versao = df_processed.attrs.get('versao') or fingerprint_frame(df_processed)
+    def build():
+        with instrumentation.stage("build_rollup", df_processed) as etapa:
+            return etapa.saida(rollups.build_rollup(df_processed))
+    return _rollup_cache().get_or_compute(versao, build)
+
+@st.cache_resource
+def _sketch_cache():
+    return VersionedFrameCache(max_entries=MAX_VERSOES_PROCESSADAS, max_bytes=MAX_BYTES_PROCESSADOS // 4)
+
+def get_tma_sketches(df_processed):
+    """Sketches de TMA por Colaborador x dia x Setor da versão atual (ver tma_sketch), compartilhados entre sessões."""
+    versao = df_processed.attrs.get('versao') or fingerprint_frame(df_processed)
+    def build():
+        with instrumentation.stage("build_tma_sketches", df_processed) as etapa:
+            return etapa.saida(tma_sketch.build_sketches(df_processed))
+    return _sketch_cache().get_or_compute(versao, build)
+
+@st.cache_resource
+def _view_cache():
+    return VersionedFrameCache(max_entries=MAX_VISOES, max_bytes=MAX_BYTES_VISOES)
+
+def get_view(df_processed, filtro):
+    """
+    Seleção filtrada da versão atual (linhas e cubo), guardada em cache LRU por
+    (versão, filtro). Os resultados dos painéis ficam dentro da própria View
+    (`View.get`), na mesma entrada do cache.
+    """
+    versao = df_processed.attrs.get('versao') or fingerprint_frame(df_processed)
+    cache = _view_cache()
+
+    if isinstance(df_processed, query_engine.ParquetBase):
+        # Filtro e cubo da seleção calculados no DuckDB; as linhas ficam no Parquet
+        def filtrar():
+            with instrumentation.stage("filtro", df_processed) as etapa:
+                cubo = etapa.saida(df_processed.rollup(filtro))
+            return query_engine.Selecao(df_processed, filtro), cubo
+        sketches = lambda: df_processed.tma_sketches(filtro)
+    else:
+        def filtrar():
+            with instrumentation.stage("filtro", df_processed) as etapa:
+                return etapa.saida(filtro.apply(df_processed)), filtro.apply(get_rollup(df_processed))
+        sketches = lambda: filtro.apply(get_tma_sketches(df_processed))
+
+    def criar():
+        df, cubo = filtrar()
+        return View(cache, versao, filtro, df, cubo, sketches)
+
+    return cache.get_or_compute((versao, filtro), criar, sizeof=View.nbytes)
+
+def get_cache_stats():
+    """Estatísticas dos caches de dados processados e de seleções (versões, memória, acertos)."""
+    return {'processados': _processed_cache().stats(), 'visoes': _view_cache().stats()}
@@ -0,0 +1,176 @@
+import pandas as pd
+
+from modules.business_logic import apply_business_rules, calc_tma, clean_data, concat_frames, flag_novo_episodio, sort_by_data
+
+class OutOfOrderError(ValueError):
+    """Linhas novas anteriores ao último contato conhecido: exige reprocessamento completo."""
+
+class EpisodeEngine:
+    """
+    Aplica as regras de duplicidade e TMA apenas às linhas novas.
+
+    Estado mantido entre lotes:
+      - último contato (Data_Completa) de cada ID_Ref, para a janela de 2 horas;
+      - contato em aberto de cada Colaborador (rótulo da linha e horário), cujo
+        TMA depende do próximo contato do mesmo colaborador.
+
+    O resultado é idêntico ao de `business_logic.apply_business_rules` sobre a
+    base inteira, desde que cada lote novo não tenha contatos anteriores aos já
+    vistos para o mesmo ID_Ref/Colaborador (senão `OutOfOrderError`).
+    """
+
+    def __init__(self):
+        self.ultimo_por_ref = {}     # ID_Ref -> Timestamp do último contato
+        self.aberto_por_colab = {}   # Colaborador -> (rótulo da linha, Timestamp)
+
+    @classmethod
+    def from_processed(cls, df):
+        """Monta o estado a partir de uma base já processada pelo caminho completo."""
+        engine = cls()
+        if df.empty:
+            return engine
+        ultimo = df.groupby('ID_Ref', observed=True, sort=False)['Data_Completa'].max()
+        engine.ultimo_por_ref = dict(zip(ultimo.index, ultimo))
+        # O contato em aberto é o único de cada colaborador sem próximo contato
+        abertos = df[df['Tempo_Ate_Proximo'].isna()]
+        engine.aberto_por_colab = dict(zip(abertos['Colaborador'], zip(abertos.index, abertos['Data_Completa'])))
+        return engine
+
+    def process(self, novo):
+        """
+        Processa um lote de linhas limpas (índice sem repetir rótulos já vistos).
+        Retorna (lote com as colunas de episódio/TMA, ajustes de Tempo_Ate_Proximo
+        das linhas anteriores indexados pelo rótulo).
+        """
+        df = novo.copy()
+        if df.empty:
+            vazio = df['Data_Completa'] - df['Data_Completa']
+            df['Tempo_Desde_Ultimo_Contato'] = vazio
+            df['Eh_Novo_Episodio'] = flag_novo_episodio(df, vazio)
+            df['Tempo_Ate_Proximo'] = vazio
+            df['Minutos_No_Atendimento'], df['TMA_Valido'] = calc_tma(vazio)
+            return df, pd.Series(dtype='timedelta64[ns]')
+
+        # --- Duplicidade: diferença para o contato anterior do mesmo ID_Ref ---
+        por_ref = df.sort_values(by=['ID_Ref', 'Data_Completa'], kind='stable')
+        tempo = por_ref.groupby('ID_Ref', observed=True)['Data_Completa'].diff()
+        primeiros = por_ref[~por_ref['ID_Ref'].duplicated()]
+        anterior = pd.Series(
+            [self.ultimo_por_ref.get(ref, pd.NaT) for ref in primeiros['ID_Ref']],
+            index=primeiros.index, dtype=primeiros['Data_Completa'].dtype
+        )
+        if (primeiros['Data_Completa'] < anterior).any():
+            raise OutOfOrderError("Lote com contatos anteriores ao último contato do mesmo ID_Ref.")
+
+        # --- TMA: diferença para o próximo contato do mesmo Colaborador ---
+        por_colab = df.sort_values(by=['Colaborador', 'Data_Completa'], kind='stable')
+        tempo_ate = por_colab.groupby('Colaborador', observed=True)['Data_Completa'].shift(-1) - por_colab['Data_Completa']
+        primeiros_colab = por_colab[~por_colab['Colaborador'].duplicated()]
+        ajustes = {}
+        for colab, ts in zip(primeiros_colab['Colaborador'], primeiros_colab['Data_Completa']):
+            aberto = self.aberto_por_colab.get(colab)
+            if aberto is None:
+                continue
+            if ts < aberto[1]:
+                raise OutOfOrderError("Lote com contatos anteriores ao último contato do mesmo Colaborador.")
+            ajustes[aberto[0]] = ts - aberto[1]
+
+        # Validações concluídas: só agora o estado é alterado
+        tempo.loc[primeiros.index] = primeiros['Data_Completa'] - anterior
+        df['Tempo_Desde_Ultimo_Contato'] = tempo
+        df['Eh_Novo_Episodio'] = flag_novo_episodio(df, df['Tempo_Desde_Ultimo_Contato'])
+        df['Tempo_Ate_Proximo'] = tempo_ate
+        df['Minutos_No_Atendimento'], df['TMA_Valido'] = calc_tma(df['Tempo_Ate_Proximo'])
+
+        ultimos = por_ref[~por_ref['ID_Ref'].duplicated(keep='last')]
+        self.ultimo_por_ref.update(zip(ultimos['ID_Ref'], ultimos['Data_Completa']))
+        ultimos_colab = por_colab[~por_colab['Colaborador'].duplicated(keep='last')]
+        self.aberto_por_colab.update(zip(ultimos_colab['Colaborador'], zip(ultimos_colab.index, ultimos_colab['Data_Completa'])))
+
+        return df, pd.Series(ajustes, dtype='timedelta64[ns]')
+
+def merge_increment(processed, lote, ajustes):
+    """Anexa o lote processado à base e corrige o TMA das linhas anteriores afetadas."""
+    lote = lote.sort_values(by='Data_Completa', kind='stable')
+    df = sort_by_data(concat_frames([processed, lote]))
+    if len(ajustes):
+        minutos, tma_valido = calc_tma(ajustes)
+        df.loc[ajustes.index, 'Tempo_Ate_Proximo'] = ajustes
+        df.loc[ajustes.index, 'Minutos_No_Atendimento'] = minutos
+        df.loc[ajustes.index, 'TMA_Valido'] = tma_valido
+    return df
+
+class IncrementalProcessor:
+    """Mantém a base processada e o EpisodeEngine em sincronia com a base limpa."""
+
+    def __init__(self):
+        self.engine = None
+        self.processed = None
+        self.versao = None
+
+    def rebuild(self, clean, versao):
+        self.processed = apply_business_rules(clean.copy())
+        self.engine = EpisodeEngine.from_processed(self.processed)
+        self.versao = versao
+        return self.processed
+
+    def append(self, novo, clean, versao):
+        """Aplica as regras só ao lote novo; recorre ao caminho completo se o lote vier fora de ordem."""
+        try:
+            lote, ajustes = self.engine.process(novo)
+        except OutOfOrderError:
+            return self.rebuild(clean, versao)
+        self.processed = merge_increment(self.processed, lote, ajustes)
+        self.versao = versao
+        return self.processed
+
+def _drop_unused_categories(df):
+    for c in df.columns:
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].cat.remove_unused_categories()
+    return df
+
+def iter_processed_chunks(chunks):
+    """
+    Processa a base bruta em blocos em ordem cronológica (ex.: um mês por vez, ou
+    `pd.read_csv(..., chunksize=N)` da planilha, que cresce em ordem), com a memória
+    limitada ao tamanho do bloco. O EpisodeEngine leva de um bloco para o outro o
+    último contato de cada ID_Ref e o contato em aberto de cada Colaborador.
+
+    Produz as linhas já definitivas de cada bloco. O contato em aberto de cada
+    colaborador fica retido até o bloco que traz o próximo contato (ou até o fim).
+    Os rótulos do índice devem ser únicos entre os blocos. Blocos fora de ordem
+    lançam `OutOfOrderError`.
+    """
+    engine = EpisodeEngine()
+    pendentes = None
+    for bloco in chunks:
+        clean = clean_data(bloco)
+        if clean.empty:
+            continue
+        lote, ajustes = engine.process(clean)
+        if len(ajustes):
+            # Contatos retidos que agora têm próximo contato
+            minutos, tma_valido = calc_tma(ajustes)
+            pendentes.loc[ajustes.index, 'Tempo_Ate_Proximo'] = ajustes
+            pendentes.loc[ajustes.index, 'Minutos_No_Atendimento'] = minutos
+            pendentes.loc[ajustes.index, 'TMA_Valido'] = tma_valido
+        linhas = lote if pendentes is None else concat_frames([pendentes, lote])
+        retidos = linhas.index.isin([rotulo for rotulo, _ in engine.aberto_por_colab.values()])
+        pendentes = _drop_unused_categories(linhas[retidos].copy())
+        yield linhas[~retidos]
+    if pendentes is not None and len(pendentes):
+        yield pendentes
+
+def process_data_chunked(chunks):
+    """
+    Equivalente a `business_logic.process_data` sobre a concatenação dos blocos,
+    processando um bloco por vez (ver `iter_processed_chunks`).
+    """
+    partes = list(iter_processed_chunks(chunks))
+    if not partes:
+        return pd.DataFrame()
+    df = concat_frames(partes)
+    # Mesma ordem do caminho completo: Data, Data_Completa e, nos empates, a ordem da planilha
+    df = df.sort_index(kind='stable')
+    return df.sort_values(by=['Data', 'Data_Completa'], kind='stable')
@@ -0,0 +1,118 @@
+import io
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+# Exportação da seleção do painel e da tabela de reincidência em CSV ou Parquet.
+# Os dados saem em blocos de um gerador direto para um arquivo temporário: na
+# geração, só as colunas exportadas de um bloco por vez ficam em memória (sem a
+# cópia da seleção nem o texto montado de uma vez). A entrega não é em streaming:
+# o download_button do Streamlit guarda o arquivo pronto como bytes, então o pico
+# de memória de um download é o tamanho do arquivo final (o Parquet é bem menor).
+COLUNAS_SELECAO = [
+    'Data', 'Hora', 'Colaborador', 'Setor', 'Portal', 'Motivo', 'Numero_Pedido',
+    'Nota_Fiscal', 'Dia_Semana', 'Eh_Novo_Episodio', 'TMA_Valido',
+]
+LINHAS_POR_BLOCO = 50_000
+FORMATOS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# ==============================================================================
+# BLOCOS
+# ==============================================================================
+def iter_frame(df, colunas=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Blocos de até `linhas_por_bloco` linhas de `df`, só com `colunas` (as que
+    existirem). Cada bloco é uma fatia por posição: copia apenas as suas linhas.
+    Sem linhas, gera um bloco vazio (o cabeçalho do arquivo sai do mesmo jeito).
+    """
+    colunas = [c for c in (colunas or df.columns) if c in df.columns]
+    posicoes = [df.columns.get_loc(c) for c in colunas]
+    for inicio in range(0, max(len(df), 1), linhas_por_bloco):
+        yield df.iloc[inicio:inicio + linhas_por_bloco, posicoes]
+
+def iter_selection(df, colunas=COLUNAS_SELECAO, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Blocos das linhas de uma seleção: DataFrame filtrado ou query_engine.Selecao (lidos do DuckDB)."""
+    if isinstance(df, pd.DataFrame):
+        return iter_frame(df, colunas, linhas_por_bloco)
+    return df.iter_chunks(colunas, linhas_por_bloco)
+
+def _sem_categorias(bloco):
+    # Texto puro: categorias diferentes entre blocos não mudam o esquema do Parquet
+    categoricas = [c for c in bloco.columns if isinstance(bloco[c].dtype, pd.CategoricalDtype)]
+    if not categoricas:
+        return bloco
+    return bloco.assign(**{c: bloco[c].astype(bloco[c].cat.categories.dtype) for c in categoricas})
+
+# ==============================================================================
+# ESCRITA
+# ==============================================================================
+def write_csv(blocos, arquivo, date_format='%d/%m/%Y'):
+    """Grava os blocos em `arquivo` (texto) como um CSV só, com o cabeçalho do primeiro bloco."""
+    for i, bloco in enumerate(blocos):
+        bloco.to_csv(arquivo, header=(i == 0), index=False, date_format=date_format)
+
+def write_parquet(blocos, arquivo):
+    """Grava os blocos em `arquivo` (binário) como um Parquet, um grupo de linhas por bloco."""
+    escritor = None
+    try:
+        for bloco in blocos:
+            bloco = _sem_categorias(bloco)
+            if escritor is None:
+                esquema = pa.Schema.from_pandas(bloco, preserve_index=False)
+                escritor = pq.ParquetWriter(arquivo, esquema)
+            escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+def export_file(blocos, formato):
+    """
+    Arquivo temporário (apagado ao ser fechado) com os blocos em `formato` ('csv' ou
+    'parquet'), já posicionado no início para leitura.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportação inválido: {formato!r} (use {', '.join(FORMATOS)})")
+    arquivo = tempfile.TemporaryFile()
+    if formato == 'csv':
+        # utf-8-sig: o Excel abre com os acentos corretos
+        texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+        write_csv(blocos, texto)
+        texto.flush()
+        texto.detach()
+    else:
+        write_parquet(blocos, arquivo)
+    arquivo.seek(0)
+    return arquivo
+
+# ==============================================================================
+# BOTÕES DE DOWNLOAD
+# ==============================================================================
+def _bytes_exportados(gerar_blocos, formato):
+    # O Streamlit só aceita o download como bytes: o arquivo inteiro vai para a
+    # memória aqui (e fica no armazenamento de mídia até a sessão descartá-lo)
+    with export_file(gerar_blocos(), formato) as arquivo:
+        return arquivo.read()
+
+def render_download_buttons(nome_arquivo, gerar_blocos, key):
+    """
+    Botões CSV e Parquet. O arquivo só é gerado quando alguém clica (download adiado):
+    `gerar_blocos()` é chamado nesse momento, então os reruns não pagam a exportação.
+    Cada download ocupa em memória o tamanho do arquivo gerado.
+    """
+    colunas = st.columns(len(FORMATOS))
+    for coluna, (formato, mime) in zip(colunas, FORMATOS.items()):
+        coluna.download_button(
+            formato.upper(),
+            data=lambda formato=formato: _bytes_exportados(gerar_blocos, formato),
+            file_name=f"{nome_arquivo}.{formato}",
+            mime=mime,
+            key=f"{key}_{formato}",
+            on_click="ignore",
+            use_container_width=True,
+        )
@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+def date_bounds(df):
+    """Primeira e última data da base (ordenada por Data), sem varrer a coluna."""
+    if not isinstance(df, pd.DataFrame):
+        return df.date_bounds()  # Base consultada no DuckDB (query_engine.ParquetBase)
+    return df['Data'].iloc[0].date(), df['Data'].iloc[-1].date()
+
+def filter_options(s):
+    """Valores distintos da coluna, em ordem alfabética (direto das categorias quando possível)."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.categories.tolist()
+    return sorted(s.dropna().unique())
+
+def column_options(df, coluna):
+    """Opções de filtro de uma coluna da base (DataFrame ou base no DuckDB)."""
+    if not isinstance(df, pd.DataFrame):
+        return df.filter_options(coluna)
+    return filter_options(df[coluna])
+
+def date_slice(df, start, end):
+    """
+    Linhas com Data entre `start` e `end` (inclusive) como fatia contígua da base,
+    localizada por busca binária na coluna Data ordenada. Não copia os dados.
+    """
+    datas = df['Data'].to_numpy()
+    inicio = np.datetime64(pd.Timestamp(start)).astype(datas.dtype)
+    fim = np.datetime64(pd.Timestamp(end) + timedelta(days=1)).astype(datas.dtype)
+    lo = np.searchsorted(datas, inicio, side='left')
+    hi = np.searchsorted(datas, fim, side='left')
+    return df.iloc[lo:hi]
+
+def category_mask(s, valores):
+    """Máscara de `s.isin(valores)` calculada pelos códigos da coluna categórica (tabela de consulta)."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        tabela = np.zeros(len(s.cat.categories) + 1, dtype=bool)  # última posição: código -1 (vazio)
+        posicoes = s.cat.categories.get_indexer(list(valores))
+        tabela[posicoes[posicoes >= 0]] = True
+        return tabela[s.cat.codes.to_numpy()]
+    return s.isin(valores).to_numpy()
+
+def filter_frame(df, start, end, setores=None, analistas=None):
+    """Aplica os filtros do painel: período (fatia), setores e analistas (máscaras por código)."""
+    df = date_slice(df, start, end)
+    mask = None
+    if setores:
+        mask = category_mask(df['Setor'], setores)
+    if analistas:
+        m = category_mask(df['Colaborador'], analistas)
+        mask = m if mask is None else mask & m
+    return df if mask is None else df[mask]
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """Seleção do painel (período e segmentos). Imutável e hashable, serve de chave de cache."""
+    start: date
+    end: date
+    setores: tuple = ()
+    analistas: tuple = ()
+
+    def apply(self, df):
+        return filter_frame(df, self.start, self.end, self.setores, self.analistas)
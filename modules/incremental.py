@@ -0,0 +1,144 @@
+import hashlib
+import threading
+import time
+
+import pandas as pd
+
+from modules import business_logic
+
+# Quantas linhas já conhecidas são relidas a cada sincronização para
+# confirmar que o histórico não foi alterado (senão recarrega tudo)
+OVERLAP_LINHAS = 20
+
+MODOS = ('linhas', 'watermark')
+
+def _row_hashes(df):
+    """Hash por linha, estável entre leituras completas e parciais da planilha."""
+    if df.empty:
+        return []
+    return pd.util.hash_pandas_object(df.astype(str), index=False).tolist()
+
+def _chain(versao, df_novo):
+    h = hashlib.blake2b(digest_size=16)
+    h.update((versao or '').encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df_novo.astype(str), index=False).values.tobytes())
+    return h.hexdigest()
+
+class IncrementalIngestor:
+    """
+    Mantém a base limpa em memória e incorpora apenas as linhas novas da planilha.
+
+    `fetch_rows(start)` deve devolver as linhas brutas a partir da posição `start`
+    (0 = primeira linha de dados). As linhas recebidas passam somente pelas etapas
+    de limpeza (`business_logic.clean_data`) antes de serem anexadas.
+
+    Modos de detecção:
+      - 'linhas': tudo o que vier depois da última linha lida é novo;
+      - 'watermark': das linhas recebidas, só entram as com Data_Completa
+        posterior à última já incorporada (útil quando a fonte reenvia linhas).
+
+    Com `acumular=False` a base limpa não é guardada: cada sincronização só
+    devolve as linhas novas (a recarga completa devolve a base inteira uma vez).
+    Serve a quem mantém o próprio estado a partir dos lotes (ex.: intraday).
+    """
+
+    def __init__(self, fetch_rows, modo='linhas', overlap=OVERLAP_LINHAS, acumular=True):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de ingestão inválido: {modo}. Use um de {MODOS}.")
+        self.fetch_rows = fetch_rows
+        self.modo = modo
+        self.overlap = overlap
+        self.acumular = acumular
+        self.clean = None          # Base limpa acumulada (índice = posição da linha na planilha)
+        self.linhas_lidas = 0      # Linhas brutas já consumidas da fonte
+        self.watermark = None      # Maior Data_Completa já incorporada
+        self.versao = None
+        self._tail_hashes = []     # Hashes das últimas linhas brutas lidas
+        self.ultimo_sync = None    # time.time() da última sincronização
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Estado persistente (para retomar após reiniciar o app)
+    # ------------------------------------------------------------------
+    def state(self):
+        return {
+            'modo': self.modo,
+            'linhas_lidas': self.linhas_lidas,
+            'watermark': None if self.watermark is None else self.watermark.isoformat(),
+            'versao': self.versao,
+            'tail_hashes': [str(h) for h in self._tail_hashes],
+        }
+
+    def restore(self, clean, state):
+        if state.get('modo') != self.modo:
+            return False
+        self.clean = clean
+        self.linhas_lidas = int(state['linhas_lidas'])
+        self.watermark = pd.Timestamp(state['watermark']) if state.get('watermark') else None
+        self.versao = state.get('versao')
+        self._tail_hashes = [int(h) for h in state.get('tail_hashes', [])]
+        return True
+
+    # ------------------------------------------------------------------
+    def _full_reload(self):
+        raw = self.fetch_rows(0)
+        raw.index = pd.RangeIndex(0, len(raw))
+        self.linhas_lidas = len(raw)
+        self._tail_hashes = _row_hashes(raw.iloc[-self.overlap:])
+        clean = business_logic.clean_data(raw.copy())
+        self.clean = clean if self.acumular else clean.iloc[:0]
+        self.watermark = clean['Data_Completa'].max() if not clean.empty else None
+        self.versao = _chain(None, raw)
+        return clean, clean, True
+
+    def reload(self):
+        """Relê a fonte inteira. Retorna (base limpa, base limpa, True), como `sync` numa recarga."""
+        with self._lock:
+            self.ultimo_sync = time.time()
+            return self._full_reload()
+
+    def sync_if_due(self, intervalo):
+        """Sincroniza apenas se a última sincronização tiver mais de `intervalo` segundos."""
+        with self._lock:
+            if self.clean is not None and self.ultimo_sync is not None and time.time() - self.ultimo_sync < intervalo:
+                return self.clean, self.clean.iloc[:0], False
+            return self.sync()
+
+    def sync(self):
+        """
+        Incorpora as linhas novas da fonte.
+        Retorna (base limpa, linhas novas já limpas, se houve recarga completa).
+        """
+        with self._lock:
+            self.ultimo_sync = time.time()
+            if self.clean is None:
+                return self._full_reload()
+
+            start = max(self.linhas_lidas - len(self._tail_hashes), 0)
+            raw = self.fetch_rows(start)
+            raw.index = pd.RangeIndex(start, start + len(raw))
+
+            # Linhas relidas precisam bater com o que já foi lido; se não, o histórico mudou
+            n_overlap = self.linhas_lidas - start
+            if len(raw) < n_overlap or _row_hashes(raw.iloc[:n_overlap]) != self._tail_hashes:
+                return self._full_reload()
+
+            raw_novo = raw.iloc[n_overlap:]
+            if raw_novo.empty:
+                return self.clean, self.clean.iloc[:0], False
+
+            self.linhas_lidas = start + len(raw)
+            self._tail_hashes = _row_hashes(raw.iloc[-self.overlap:])
+            self.versao = _chain(self.versao, raw_novo)
+
+            novo = business_logic.clean_data(raw_novo.copy())
+            if self.modo == 'watermark' and self.watermark is not None:
+                novo = novo[novo['Data_Completa'] > self.watermark]
+            if novo.empty:
+                return self.clean, novo, False
+
+            if self.acumular:
+                self.clean = business_logic.concat_frames([self.clean, novo])
+            novo_max = novo['Data_Completa'].max()
+            self.watermark = novo_max if self.watermark is None else max(self.watermark, novo_max)
+            return self.clean, novo, False
@@ -0,0 +1,159 @@
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Chave do toggle do painel e do estado por sessão
+CHAVE_ATIVO = "diagnostico_ativo"
+_CHAVE_ATUAL = "_diagnostico_atual"
+_CHAVE_HISTORICO = "_diagnostico_historico"
+MAX_HISTORICO = 50
+
+try:
+    _PAGINA = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGINA = 4096
+
+def _rss_bytes():
+    """Memória residente do processo (Linux); None onde /proc não existe."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGINA
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _linhas(obj):
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+# ==============================================================================
+# MEDIÇÃO POR ETAPA
+# ==============================================================================
+class _Etapa:
+    """Registro de uma etapa em andamento; `saida(obj)` anota as linhas produzidas."""
+    __slots__ = ("registro",)
+
+    def __init__(self, registro):
+        self.registro = registro
+
+    def saida(self, obj):
+        self.registro['linhas_saida'] = _linhas(obj)
+        return obj
+
+class _EtapaNula:
+    __slots__ = ()
+
+    def saida(self, obj):
+        return obj
+
+_NULA = _EtapaNula()
+
+def _registros():
+    """Lista de etapas do rerun atual, ou None com o painel desligado (ou fora de uma sessão)."""
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None  # Ex.: atualização em segundo plano
+    try:
+        if not st.session_state.get(CHAVE_ATIVO, False):
+            return None
+        return st.session_state.get(_CHAVE_ATUAL)
+    except Exception:
+        return None
+
+@contextmanager
+def _medir(registros, nome, entrada):
+    registro = {'etapa': nome, 'linhas_entrada': _linhas(entrada) if entrada is not None else None, 'linhas_saida': None}
+    rss_antes = _rss_bytes()
+    inicio = time.perf_counter()
+    try:
+        yield _Etapa(registro)
+    finally:
+        registro['tempo_ms'] = (time.perf_counter() - inicio) * 1000
+        rss_depois = _rss_bytes()
+        registro['memoria_mb'] = (rss_depois - rss_antes) / 1e6 if rss_antes is not None and rss_depois is not None else None
+        registros.append(registro)
+
+def stage(nome, entrada=None):
+    """
+    Mede uma etapa do rerun (tempo, linhas de entrada/saída e variação de memória):
+
+        with instrumentation.stage("process_data", df_raw) as etapa:
+            df = etapa.saida(business_logic.process_data(df_raw))
+
+    Com o painel desligado devolve um contexto nulo, sem medir nada.
+    """
+    registros = _registros()
+    if registros is None:
+        return nullcontext(_NULA)
+    return _medir(registros, nome, entrada)
+
+def start_run():
+    """Abre o registro de um novo rerun (chamar no início do script)."""
+    try:
+        if st.session_state.get(CHAVE_ATIVO, False):
+            st.session_state[_CHAVE_ATUAL] = []
+            st.session_state['_diagnostico_inicio'] = time.time()
+    except Exception:
+        pass
+
+def _finish_run():
+    """Fecha o rerun atual e o guarda no histórico da sessão."""
+    registros = st.session_state.get(_CHAVE_ATUAL)
+    if registros is None:
+        return None
+    historico = st.session_state.setdefault(_CHAVE_HISTORICO, deque(maxlen=MAX_HISTORICO))
+    rerun = {
+        'rerun': (historico[-1]['rerun'] + 1) if historico else 1,
+        'inicio': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(st.session_state.get('_diagnostico_inicio', time.time()))),
+        'etapas': registros,
+    }
+    historico.append(rerun)
+    st.session_state[_CHAVE_ATUAL] = None
+    return rerun
+
+# ==============================================================================
+# EXPORTAÇÃO E PAINEL
+# ==============================================================================
+def history_frame(historico):
+    """Histórico em formato longo: uma linha por rerun x etapa."""
+    linhas = [dict(rerun=r['rerun'], inicio=r['inicio'], **e) for r in historico for e in r['etapas']]
+    colunas = ['rerun', 'inicio', 'etapa', 'tempo_ms', 'linhas_entrada', 'linhas_saida', 'memoria_mb']
+    return pd.DataFrame(linhas, columns=colunas)
+
+def render_panel():
+    """Toggle e painel de diagnóstico na sidebar (chamar no fim do script, após todas as etapas)."""
+    with st.sidebar:
+        st.toggle("🩺 Diagnóstico de desempenho", key=CHAVE_ATIVO)
+        if not st.session_state.get(CHAVE_ATIVO):
+            return
+        rerun = _finish_run()
+        historico = list(st.session_state.get(_CHAVE_HISTORICO, []))
+        with st.expander("Tempo por etapa", expanded=True):
+            if rerun is None:
+                st.caption("A medição começa no próximo rerun.")
+                return
+            df_atual = history_frame([rerun])
+            st.caption(f"Rerun #{rerun['rerun']} • {df_atual['tempo_ms'].sum():,.0f} ms medidos")
+            st.dataframe(
+                df_atual[['etapa', 'tempo_ms', 'linhas_entrada', 'linhas_saida', 'memoria_mb']],
+                hide_index=True, use_container_width=True,
+                column_config={
+                    'tempo_ms': st.column_config.NumberColumn("ms", format="%.1f"),
+                    'memoria_mb': st.column_config.NumberColumn("Δ MB", format="%.1f"),
+                },
+            )
+
+            df_hist = history_frame(historico)
+            if df_hist['rerun'].nunique() > 1:
+                st.caption("Histórico (ms por rerun)")
+                st.line_chart(df_hist.pivot_table(index='rerun', columns='etapa', values='tempo_ms', aggfunc='sum'), height=200)
+
+            c1, c2 = st.columns(2)
+            c1.download_button("JSON", json.dumps(historico, ensure_ascii=False, indent=2), file_name="diagnostico.json", mime="application/json", use_container_width=True)
+            c2.download_button("CSV", df_hist.to_csv(index=False), file_name="diagnostico.csv", mime="text/csv", use_container_width=True)
@@ -0,0 +1,210 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules import business_logic, rollups
+from modules.business_logic import JANELA_DUPLICIDADE, calc_tma, contains_upper
+from modules.episode_engine import EpisodeEngine, OutOfOrderError
+
+# Modo ao vivo: contadores do dia corrente por Colaborador x Setor x hora, mantidos
+# só com as linhas que chegam da planilha. O processamento custa o tamanho do lote
+# novo (e dos contadores do dia), não o do histórico. A leitura também, quando a
+# fonte entrega só as linhas novas (uma aba com conta de serviço); no link público
+# ou com várias abas a planilha inteira é baixada a cada leitura, então o intervalo
+# padrão é maior.
+GRAO = ['Colaborador', 'Setor', 'Hora_Cheia']
+MEDIDAS = ['Registros', 'Episodios', 'TMA_Soma', 'TMA_Qtd']
+INTERVALO_AO_VIVO = 60              # segundos entre leituras da planilha
+INTERVALO_AO_VIVO_COMPLETO = 300       # idem, quando cada leitura baixa a planilha inteira
+
+class IntradayCounters:
+    """
+    Contadores de um dia por Colaborador x Setor x Hora_Cheia, com as medidas do
+    cubo (rollups): Registros, Episodios, TMA_Soma, TMA_Qtd e Primeira_Entrada.
+
+    Episódio e TMA vêm do EpisodeEngine, aplicado só aos lotes novos. O TMA de um
+    contato depende do próximo contato do mesmo colaborador: os contatos do dia
+    ainda em aberto ficam guardados e, quando o próximo chega (`ajustes` do
+    engine), o TMA entra na hora do contato original.
+    """
+
+    def __init__(self, dia):
+        self.dia = pd.Timestamp(dia).normalize()
+        self.engine = EpisodeEngine()
+        self.contadores = {}   # (Colaborador, Setor, Hora_Cheia) -> [Registros, Episodios, TMA_Soma, TMA_Qtd, Primeira_Entrada]
+        self.abertos = {}      # Rótulo da linha -> chave do contato do dia ainda sem próximo contato
+
+    @classmethod
+    def from_clean(cls, clean, dia):
+        """
+        Monta os contadores a partir da base limpa. Bastam as linhas desde o início
+        do dia menos a janela de duplicidade: um contato anterior a isso não muda o
+        episódio de nenhuma linha do dia, e o TMA só depende do contato seguinte.
+        """
+        contadores = cls(dia)
+        contadores.update(clean[clean['Data_Completa'] >= contadores.dia - JANELA_DUPLICIDADE])
+        return contadores
+
+    def novo_dia(self, dia):
+        """Zera os contadores para `dia`; o estado do engine continua (a janela de 2 horas atravessa a meia-noite)."""
+        self.dia = pd.Timestamp(dia).normalize()
+        self.contadores = {}
+        self.abertos = {}
+        limite = self.dia - JANELA_DUPLICIDADE
+        self.engine.ultimo_por_ref = {ref: ts for ref, ts in self.engine.ultimo_por_ref.items() if ts >= limite}
+
+    def update(self, novo):
+        """
+        Incorpora um lote de linhas limpas. Lotes com contatos anteriores aos já
+        vistos levantam OutOfOrderError sem alterar os contadores.
+        """
+        if novo.empty:
+            return self
+        lote, ajustes = self.engine.process(novo)
+
+        # Contatos do dia que estavam em aberto e agora têm TMA
+        fechados = [rotulo for rotulo in ajustes.index if rotulo in self.abertos]
+        if fechados:
+            _, tma = calc_tma(ajustes.loc[fechados])
+            for rotulo, valor in zip(fechados, tma):
+                chave = self.abertos.pop(rotulo)
+                if not np.isnan(valor):
+                    self.contadores[chave][2] += valor
+                    self.contadores[chave][3] += 1
+
+        lote = lote[lote['Data'].dt.normalize() == self.dia]
+        if lote.empty:
+            return self
+        linhas = pd.DataFrame({c: lote[c].astype(str).to_numpy() for c in GRAO})
+        linhas['Episodios'] = lote['Eh_Novo_Episodio'].to_numpy()
+        linhas['TMA'] = lote['TMA_Valido'].to_numpy()
+        linhas['Data_Completa'] = lote['Data_Completa'].to_numpy()
+        grupos = linhas.groupby(GRAO, sort=False).agg(
+            Registros=('Episodios', 'size'),
+            Episodios=('Episodios', 'sum'),
+            TMA_Soma=('TMA', 'sum'),
+            TMA_Qtd=('TMA', 'count'),
+            Primeira_Entrada=('Data_Completa', 'min'),
+        )
+        for chave, registros, episodios, tma_soma, tma_qtd, entrada in grupos.itertuples(name=None):
+            atual = self.contadores.get(chave)
+            if atual is None:
+                self.contadores[chave] = [registros, episodios, tma_soma, tma_qtd, entrada]
+            else:
+                atual[0] += registros
+                atual[1] += episodios
+                atual[2] += tma_soma
+                atual[3] += tma_qtd
+                atual[4] = min(atual[4], entrada)
+
+        # Contatos sem próximo contato: o TMA chega com um lote futuro
+        em_aberto = lote['Tempo_Ate_Proximo'].isna().to_numpy()
+        self.abertos.update(zip(lote.index[em_aberto], linhas.loc[em_aberto, GRAO].itertuples(index=False, name=None)))
+        return self
+
+    def cubo(self):
+        """Contadores no formato do cubo (Data = dia): aceitam FilterSpec e as consultas de rollups."""
+        cubo = pd.DataFrame(
+            [(self.dia, *chave, *valores) for chave, valores in self.contadores.items()],
+            columns=['Data'] + GRAO + MEDIDAS + ['Primeira_Entrada'],
+        )
+        return cubo.astype({
+            'Data': 'datetime64[us]', 'Registros': 'int64', 'Episodios': 'int64',
+            'TMA_Soma': 'float64', 'TMA_Qtd': 'int64', 'Primeira_Entrada': 'datetime64[us]',
+        })
+
+# ==============================================================================
+# ATUALIZAÇÃO (compartilhada entre sessões)
+# ==============================================================================
+class LiveTracker:
+    """
+    Mantém os IntradayCounters do dia corrente a partir de um IncrementalIngestor
+    sem acúmulo (`acumular=False`), que entrega só as linhas novas da fonte.
+    A troca de dia zera os contadores; histórico alterado na fonte (recarga
+    completa) ou lote fora de ordem remontam os contadores a partir da base.
+    """
+
+    def __init__(self, ingestor, hoje=None):
+        self.ingestor = ingestor
+        self._hoje = hoje or (lambda: pd.Timestamp.now().normalize())
+        self.contadores = None
+        self.linhas_novas = 0        # Linhas recebidas na última leitura
+        self._cubo = None
+        self._lock = threading.Lock()
+
+    def _remontar(self, clean, dia):
+        self.contadores = IntradayCounters.from_clean(clean, dia)
+        self.linhas_novas = len(clean)
+
+    def atualizar(self, intervalo=INTERVALO_AO_VIVO):
+        """
+        Lê a fonte se a última leitura tiver mais de `intervalo` segundos e devolve o
+        cubo do dia (o dia vai em `attrs['dia']`). O cubo é compartilhado: não modificar.
+        """
+        with self._lock:
+            dia = self._hoje()
+            clean, novo, completo = self.ingestor.sync_if_due(intervalo)
+            if self.contadores is None or completo:
+                if not completo:
+                    clean, _, _ = self.ingestor.reload()
+                self._remontar(clean, dia)
+                self._cubo = None
+            else:
+                if self.contadores.dia != pd.Timestamp(dia).normalize():
+                    self.contadores.novo_dia(dia)
+                    self._cubo = None
+                if len(novo):
+                    try:
+                        self.contadores.update(novo)
+                        self.linhas_novas = len(novo)
+                    except OutOfOrderError:
+                        self._remontar(self.ingestor.reload()[0], dia)
+                    self._cubo = None
+            if self._cubo is None:
+                self._cubo = self.contadores.cubo()
+                self._cubo.attrs['dia'] = self.contadores.dia
+            return self._cubo
+
+    def status(self):
+        return {
+            'dia': None if self.contadores is None else self.contadores.dia,
+            'lido_em': self.ingestor.ultimo_sync,
+            'idade_s': None if self.ingestor.ultimo_sync is None else time.time() - self.ingestor.ultimo_sync,
+            'linhas_novas': self.linhas_novas,
+        }
+
+# ==============================================================================
+# CURVA PROJETADO x REALIZADO
+# ==============================================================================
+def curva_horaria(cubo, agora=None, jornada=business_logic.JORNADA):
+    """
+    Meta projetada e realizado acumulados hora a hora, para SAC e Pendência.
+    A meta de cada presença (rollups.metas) é distribuída por igual entre a entrada
+    e o fim da jornada; o realizado são os episódios até o fim de cada hora (horas
+    depois de `agora` ficam sem realizado). Horas inválidas ("na:00") ficam de fora.
+    """
+    df_metas = rollups.metas(cubo, jornada)
+    entrada = df_metas['Hora_Entrada']
+    inicio = np.maximum(jornada['inicio_hora'], (entrada.dt.hour + entrada.dt.minute / 60).to_numpy())
+    duracao = jornada['fim_hora'] - inicio
+
+    hora = pd.to_numeric(cubo['Hora_Cheia'].astype(str).str[:2], errors='coerce')
+    primeira = int(min(jornada['inicio_hora'], hora.min())) if hora.notna().any() else int(jornada['inicio_hora'])
+    ultima = int(max(np.ceil(jornada['fim_hora']) - 1, hora.max())) if hora.notna().any() else int(np.ceil(jornada['fim_hora']) - 1)
+    horas = np.arange(primeira, ultima + 1)
+
+    # Fração da jornada de cada presença já decorrida no fim de cada hora
+    decorrido = (horas + 1)[None, :] - inicio[:, None]
+    fracao = np.clip(np.divide(decorrido, duracao[:, None], out=np.zeros_like(decorrido, dtype='float64'), where=duracao[:, None] > 0), 0, 1)
+
+    curva = pd.DataFrame({'Hora': horas, 'Hora_Cheia': [f"{h:02d}:00" for h in horas]})
+    for setor, coluna_meta, padrao in (('SAC', 'Meta_SAC', 'SAC'), ('PEND', 'Meta_PEND', 'PEND')):
+        curva[f'Projetado_{setor}'] = df_metas[coluna_meta].to_numpy(dtype='float64') @ fracao
+        mascara = contains_upper(cubo['Setor'], padrao).to_numpy()
+        por_hora = cubo['Episodios'][mascara].groupby(hora[mascara]).sum()
+        curva[f'Realizado_{setor}'] = por_hora.reindex(horas, fill_value=0).cumsum().to_numpy(dtype='float64')
+    if agora is not None:
+        curva.loc[curva['Hora'] > pd.Timestamp(agora).hour, ['Realizado_SAC', 'Realizado_PEND']] = np.nan
+    return curva
@@ -0,0 +1,143 @@
+import json
+
+import numpy as np
+
+from modules import business_logic, reincidencia, rollups, tma_sketch
+
+# Métricas do dashboard sem Streamlit: os painéis e o relatório em lote
+# (python -m modules.batch_report) usam as mesmas funções.
+
+# ==============================================================================
+# INDICADORES GERAIS
+# ==============================================================================
+def resumo_metas(kpis, df_metas):
+    """Metas totais por setor e percentual atingido (média simples de SAC e Pendência)."""
+    meta_total_sac = df_metas['Meta_SAC'].sum()
+    meta_total_pend = df_metas['Meta_PEND'].sum()
+    perc_sac = (kpis['realizado_sac'] / meta_total_sac * 100) if meta_total_sac > 0 else 0
+    perc_pend = (kpis['realizado_pend'] / meta_total_pend * 100) if meta_total_pend > 0 else 0
+    return {
+        'meta_total_sac': int(meta_total_sac),
+        'meta_total_pend': int(meta_total_pend),
+        'perc_sac': float(perc_sac),
+        'perc_pend': float(perc_pend),
+        'media_meta': float((perc_sac + perc_pend) / 2),
+    }
+
+# ==============================================================================
+# PAINÉIS DE COLABORADORES
+# ==============================================================================
+def eficiencia_diaria(cubo):
+    """Atendimentos por colaborador divididos pelos dias do período (ordem crescente)."""
+    stats = rollups.stats_colaborador(cubo)
+    df_vol = stats[['Colaborador', 'Liquido']].copy()
+    df_vol['Media_Dia'] = (df_vol['Liquido'] / rollups.dias_no_periodo(cubo)).round(1)
+    return df_vol.sort_values('Media_Dia', ascending=True)
+
+def alertas_sla(cubo, n=3):
+    """
+    Colaboradores com TMA acima do limite: quem tem volume alto (> média + 20%)
+    tem o limite flexibilizado para +50% do TMA médio da equipe; os demais, +30%.
+    """
+    stats = rollups.stats_colaborador(cubo)
+    df_stats = stats[['Colaborador', 'TMA']].assign(Volume=stats['Liquido'])
+    media_tma_equipe = df_stats['TMA'].mean()
+    media_vol = df_stats['Volume'].mean()
+    df_stats['Limite_TMA'] = np.where(df_stats['Volume'] > media_vol * 1.2, media_tma_equipe * 1.5, media_tma_equipe * 1.3)
+    return df_stats[df_stats['TMA'] > df_stats['Limite_TMA']].head(n)
+
+def alertas_sla_percentil(cubo, sketches, n=3, q=0.9):
+    """
+    Mesma regra de `alertas_sla` sobre o percentil `q` do TMA (padrão P90) em vez
+    da média: o limite parte do percentil da equipe (sketches somados), então
+    aparece quem tem cauda longa de atendimentos lentos mesmo com média normal.
+    """
+    stats = rollups.stats_colaborador(cubo)
+    pct = tma_sketch.percentis(sketches, 'Colaborador', qs=(q,))
+    por_colaborador = dict(zip(pct['Colaborador'].astype(str), pct.iloc[:, -1]))
+    df_stats = stats[['Colaborador']].assign(TMA=stats['Colaborador'].astype(str).map(por_colaborador).astype('float64'), Volume=stats['Liquido'])
+    tma_equipe = tma_sketch.percentis(sketches, qs=(q,)).iloc[0, -1]
+    media_vol = df_stats['Volume'].mean()
+    df_stats['Limite_TMA'] = np.where(df_stats['Volume'] > media_vol * 1.2, tma_equipe * 1.5, tma_equipe * 1.3)
+    return df_stats[df_stats['TMA'] > df_stats['Limite_TMA']].head(n)
+
+def capacidade(cubo, min_tmas=5, jornada=business_logic.JORNADA):
+    """Capacidade diária projetada (tempo útil / TMA médio) para quem tem mais de `min_tmas` TMAs válidos."""
+    stats = rollups.stats_colaborador(cubo)
+    df_tma = stats[['Colaborador']].assign(mean=stats['TMA'], count=stats['TMA_Qtd'])
+    df_tma = df_tma[df_tma['count'] > min_tmas]
+    df_tma['Capacidade'] = (business_logic.tempo_util_minutos(jornada) / df_tma['mean']).fillna(0).astype(int)
+    return df_tma.sort_values('Capacidade', ascending=False)
+
+# ==============================================================================
+# PEDIDOS E PORTAIS
+# ==============================================================================
+def top_motivos_portal(cubo, n=5):
+    """Volume por Portal x Motivo, restrito aos `n` motivos de maior volume no período."""
+    df = rollups.volume_portal_motivo(cubo)
+    top = df.groupby('Motivo', observed=True)['Volume'].sum().nlargest(n).index.tolist()
+    return df[df['Motivo'].isin(top)]
+
+def distribuicao_reincidencia(atendimentos):
+    """Quantidade de pedidos por número de atendimentos (2x, 3x, ...), a partir dos atendimentos por pedido."""
+    dist = atendimentos.value_counts().sort_index().reset_index()
+    dist.columns = ['Atendimentos', 'Pedidos']
+    dist['Label'] = dist['Atendimentos'].astype(str) + 'x'
+    return dist
+
+# ==============================================================================
+# TODAS AS MÉTRICAS DE UMA SELEÇÃO
+# ==============================================================================
+def _records(df):
+    # Passa pelo JSON do pandas: datas em ISO, NaN -> None e tipos nativos do Python
+    return json.loads(df.to_json(orient='records', date_format='iso', force_ascii=False))
+
+def compute_metrics(df_processed, filtro, cubo=None, sketches=None, top_reincidencia=50):
+    """
+    Calcula todas as métricas do dashboard para a seleção `filtro` (FilterSpec).
+    `cubo` e `sketches` são os da base inteira (evita reconstruí-los a cada chamada).
+    Retorna um dicionário serializável em JSON.
+    """
+    if cubo is None:
+        cubo = rollups.build_rollup(df_processed)
+    if sketches is None:
+        sketches = tma_sketch.build_sketches(df_processed)
+    df = filtro.apply(df_processed)
+    cubo = filtro.apply(cubo)
+    sketches = filtro.apply(sketches)
+
+    df_metas = rollups.metas(cubo)
+    kpis = rollups.kpis(cubo)
+    contagem = reincidencia.contagem_por_pedido(df)
+    total_pedidos, pedidos_reincidentes, taxa_reincidencia = reincidencia.resumo_pedidos(df, contagem)
+
+    return {
+        'periodo': {
+            'inicio': filtro.start.isoformat(),
+            'fim': filtro.end.isoformat(),
+            'setores': list(filtro.setores),
+            'analistas': list(filtro.analistas),
+        },
+        'kpis': {**kpis, **resumo_metas(kpis, df_metas)},
+        'metas': _records(df_metas),
+        'ranking': _records(rollups.ranking(cubo)),
+        'eficiencia': _records(eficiencia_diaria(cubo)),
+        'alertas_sla': _records(alertas_sla(cubo)),
+        'alertas_sla_p90': _records(alertas_sla_percentil(cubo, sketches)),
+        'capacidade': _records(capacidade(cubo)),
+        'tma_percentis': {
+            'equipe': _records(tma_sketch.percentis(sketches).drop(columns='Grupo'))[0],
+            'colaboradores': _records(tma_sketch.percentis_colaborador(sketches)),
+        },
+        'heatmap': _records(rollups.heatmap(cubo)),
+        'pedidos': {
+            'total_pedidos': int(total_pedidos),
+            'pedidos_reincidentes': int(pedidos_reincidentes),
+            'taxa_reincidencia': float(taxa_reincidencia),
+            'portais_ativos': int(rollups.portais_ativos(cubo)),
+            'volume_portal': _records(rollups.volume_portal(cubo)),
+            'top_motivos_portal': _records(top_motivos_portal(cubo)),
+            'distribuicao_reincidencia': _records(distribuicao_reincidencia(reincidencia.atendimentos_reincidentes(contagem))),
+            'reincidencia': _records(reincidencia.tabela_reincidencia(df, top_reincidencia, contagem)),
+        },
+    }
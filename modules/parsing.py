@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Formatos em que a planilha entrega Data e Hora (Google Sheets, CSV exportado ou Excel).
+# Cada texto distinto é convertido uma única vez, tentando os formatos em ordem.
+FORMATOS_DATA = (
+    '%d/%m/%Y',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%y',
+    '%Y-%m-%d',
+    '%Y-%m-%d %H:%M:%S',
+)
+
+# hh:mm, hh:mm:ss ou hh:mm:ss.fff, com ou sem data na frente (ex.: "1899-12-30 08:15:00" do Excel)
+_RE_HORA = r'^\s*(?:\d{4}-\d{2}-\d{2}[ T])?(\d{1,2}):(\d{2})(?::(\d{2}(?:\.\d+)?))?\s*$'
+HORA_CHEIA_INVALIDA = "na:00"
+
+def _distinct(s):
+    """Códigos por linha (-1 = vazio) e os textos distintos da coluna."""
+    codes, uniques = pd.factorize(s)
+    return codes, pd.Series(np.asarray(uniques, dtype=object)).astype(str).str.strip()
+
+def parse_datas(s):
+    """
+    Converte a coluna Data (dia primeiro) para datetime. Textos fora dos formatos
+    conhecidos ainda passam pela inferência do pandas, mas só uma vez por valor distinto.
+    Valores inválidos viram NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    codes, textos = _distinct(s)
+    datas = pd.Series(pd.NaT, index=textos.index, dtype='datetime64[us]')
+    for formato in FORMATOS_DATA:
+        faltam = datas.isna()
+        if not faltam.any():
+            break
+        datas[faltam] = pd.to_datetime(textos[faltam], format=formato, errors='coerce')
+    faltam = datas.isna()
+    if faltam.any():
+        datas[faltam] = pd.to_datetime(textos[faltam], format='mixed', dayfirst=True, errors='coerce')
+    valores = np.append(datas.to_numpy(), np.datetime64('NaT', 'us'))  # código -1 (vazio) -> NaT
+    return pd.Series(valores[codes], index=s.index, name=s.name)
+
+def parse_horas(s):
+    """
+    Converte a coluna Hora, uma vez por texto distinto. Retorna o horário como
+    timedelta (NaT nas linhas com hora vazia ou malformada) e a Hora_Cheia ("08:00")
+    como Categorical, com "na:00" para as horas inválidas.
+    """
+    codes, textos = _distinct(s)
+    partes = textos.str.extract(_RE_HORA)
+    horas = pd.to_numeric(partes[0], errors='coerce')
+    minutos = pd.to_numeric(partes[1], errors='coerce')
+    segundos = pd.to_numeric(partes[2], errors='coerce').fillna(0)
+    validos = (horas < 24) & (minutos < 60) & (segundos < 60)
+
+    total_us = ((horas * 3600 + minutos * 60 + segundos) * 1_000_000).where(validos)
+    tempo = np.append(pd.to_timedelta(total_us, unit='us').to_numpy().astype('timedelta64[us]'), np.timedelta64('NaT', 'us'))
+
+    cheia = horas.where(validos).map(lambda h: f"{int(h):02d}:00", na_action='ignore').fillna(HORA_CHEIA_INVALIDA)
+    cheia_codes, categorias = pd.factorize(np.append(cheia.to_numpy(dtype=object), HORA_CHEIA_INVALIDA), sort=True)
+
+    return (
+        pd.Series(tempo[codes], index=s.index, name=s.name),
+        pd.Series(pd.Categorical.from_codes(cheia_codes[codes], categories=categorias), index=s.index).cat.remove_unused_categories(),
+    )
+
+def format_datas(datas, formato='%d/%m/%Y'):
+    """`datas.dt.strftime(formato)` formatando cada data distinta uma única vez."""
+    codes, uniques = pd.factorize(datas)
+    textos = np.append(np.asarray(uniques.strftime(formato), dtype=object), None)
+    return pd.Series(textos[codes], index=datas.index, name=datas.name, dtype='str')
+
+def combine_data_hora(datas, horas):
+    """Data + Hora linha a linha; onde a hora é inválida fica só a data (sem perder as demais linhas)."""
+    return datas + horas.fillna(pd.Timedelta(0))
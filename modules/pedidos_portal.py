@@ -2,6 +2,7 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+from modules import charts, export, metrics, reincidencia, rollups
 
 THEME = {
     'primary': '#6366f1',
@@ -15,7 +16,11 @@ THEME = {
 
 CHART_TITLE_STYLE = "font-size:18px; font-weight:600; color:#1f2937; font-family:Inter,sans-serif; margin-bottom:-10px; padding-left:5px;"
 
-def render_pedidos_portal(df):
+def _calc(visao, nome, compute):
+    # Com uma View (data_loader.get_view), o resultado vem do cache de seleções
+    return compute() if visao is None else visao.get(nome, compute)
+
+def render_pedidos_portal(df, cubo=None, visao=None):
     st.markdown("<br>", unsafe_allow_html=True)
 
     # --- Validações de colunas necessárias ---
@@ -25,21 +30,22 @@ def render_pedidos_portal(df):
         st.error(f"Colunas ausentes no DataFrame: {missing}")
         return
 
-    df = df.copy()
+    # Agregados por Portal/Motivo vêm do cubo; as linhas só são usadas nas contagens por pedido
+    if cubo is None:
+        cubo = rollups.build_rollup(df)
 
     # ── KPIs ─────────────────────────────────────────────────────────────────
-    total_pedidos     = df['Numero_Pedido'].nunique()
-    total_atendimentos = df['Eh_Novo_Episodio'].sum()
-    portais_ativos    = df['Portal'].nunique()
-
-    reincidentes = (
-        df[df['Eh_Novo_Episodio'] == 1]
-        .groupby('Numero_Pedido')
-        .size()
-        .reset_index(name='count')
-    )
-    pedidos_reincidentes = reincidentes[reincidentes['count'] > 1].shape[0]
-    taxa_reincidencia = (pedidos_reincidentes / total_pedidos * 100) if total_pedidos > 0 else 0
+    total_atendimentos = cubo['Episodios'].sum()
+    portais_ativos    = rollups.portais_ativos(cubo)
+
+    # Um agrupamento por pedido serve aos KPIs, à distribuição e à tabela de reincidência
+    if isinstance(df, pd.DataFrame):
+        contagem = _calc(visao, 'pedidos_contagem', lambda: reincidencia.contagem_por_pedido(df))
+        total_pedidos, pedidos_reincidentes, taxa_reincidencia = reincidencia.resumo_pedidos(df, contagem)
+    else:
+        # Seleção no DuckDB (query_engine.Selecao): só os pedidos reincidentes voltam para o Python
+        contagem = _calc(visao, 'pedidos_contagem', df.contagem_reincidentes)
+        total_pedidos, pedidos_reincidentes, taxa_reincidencia = _calc(visao, 'pedidos_resumo', df.resumo_pedidos)
 
     k1, k2, k3, k4 = st.columns(4)
     kpi_style = """
@@ -69,116 +75,96 @@ def render_pedidos_portal(df):
     col1, col2 = st.columns([1, 2])
 
     with col1:
-        df_portal = (
-            df[df['Eh_Novo_Episodio'] == 1]
-            .groupby('Portal')
-            .size()
-            .reset_index(name='Volume')
-            .sort_values('Volume', ascending=True)
-        )
-        fig_portal = go.Figure(go.Bar(
-            x=df_portal['Volume'],
-            y=df_portal['Portal'],
-            orientation='h',
-            marker=dict(
-                color=df_portal['Volume'],
-                colorscale=[[0, '#e0e7ff'], [1, THEME['primary']]],
-                showscale=False,
-                cornerradius=6
-            ),
-            text=df_portal['Volume'],
-            textposition='outside',
-            textfont=dict(size=12, color=THEME['text'])
-        ))
-        fig_portal.update_layout(
-            height=320,
-            xaxis=dict(showgrid=False, showticklabels=False),
-            yaxis=dict(title=None),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(l=10, r=40, t=20, b=10)
-        )
+        df_portal = _calc(visao, 'volume_portal', lambda: rollups.volume_portal(cubo)).sort_values('Volume', ascending=True)
+        def build(df_portal):
+            fig_portal = go.Figure(go.Bar(
+                x=df_portal['Volume'],
+                y=df_portal['Portal'],
+                orientation='h',
+                marker=dict(
+                    color=df_portal['Volume'],
+                    colorscale=[[0, '#e0e7ff'], [1, THEME['primary']]],
+                    showscale=False,
+                    cornerradius=6
+                ),
+                text=df_portal['Volume'],
+                textposition='outside',
+                textfont=dict(size=12, color=THEME['text'])
+            ))
+            fig_portal.update_layout(
+                height=320,
+                xaxis=dict(showgrid=False, showticklabels=False),
+                yaxis=dict(title=None),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                margin=dict(l=10, r=40, t=20, b=10)
+            )
+            return fig_portal
         st.markdown(f"<p style='{CHART_TITLE_STYLE}'>🖥️ Volume por Portal</p>", unsafe_allow_html=True)
-        st.plotly_chart(fig_portal, use_container_width=True)
+        st.plotly_chart(charts.cached_figure('volume_portal', df_portal, build), use_container_width=True)
 
     with col2:
-        top_motivos = (
-            df[df['Eh_Novo_Episodio'] == 1]
-            .groupby(['Portal', 'Motivo'])
-            .size()
-            .reset_index(name='Volume')
-        )
         # top 5 motivos globais
-        top5 = (
-            top_motivos.groupby('Motivo')['Volume'].sum()
-            .nlargest(5).index.tolist()
-        )
-        top_motivos = top_motivos[top_motivos['Motivo'].isin(top5)]
-
-        fig_motivo = px.bar(
-            top_motivos,
-            x='Portal', y='Volume', color='Motivo',
-            barmode='stack',
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-        fig_motivo.update_traces(marker_cornerradius=4)
-        fig_motivo.update_layout(
-            height=320,
-            xaxis=dict(title=None, showgrid=False),
-            yaxis=dict(title=None, showgrid=True, gridcolor=THEME['grid']),
-            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, title=None, font=dict(size=11)),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(l=10, r=10, t=40, b=10)
-        )
+        top_motivos = _calc(visao, 'top_motivos_portal_5', lambda: metrics.top_motivos_portal(cubo, n=5))
+
+        def build(top_motivos):
+            fig_motivo = px.bar(
+                top_motivos,
+                x='Portal', y='Volume', color='Motivo',
+                barmode='stack',
+                color_discrete_sequence=px.colors.qualitative.Pastel
+            )
+            fig_motivo.update_traces(marker_cornerradius=4)
+            fig_motivo.update_layout(
+                height=320,
+                xaxis=dict(title=None, showgrid=False),
+                yaxis=dict(title=None, showgrid=True, gridcolor=THEME['grid']),
+                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1, title=None, font=dict(size=11)),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                margin=dict(l=10, r=10, t=40, b=10)
+            )
+            return fig_motivo
         st.markdown(f"<p style='{CHART_TITLE_STYLE}'>📌 Top 5 Motivos por Portal</p>", unsafe_allow_html=True)
-        st.plotly_chart(fig_motivo, use_container_width=True)
+        st.plotly_chart(charts.cached_figure('top_motivos_portal', top_motivos, build), use_container_width=True)
 
     # ── Linha 2: Reincidência ────────────────────────────────────────────────
     st.markdown(f"<p style='{CHART_TITLE_STYLE}'>🔁 Pedidos com Reincidência (mais de 1 atendimento)</p>", unsafe_allow_html=True)
     st.markdown("<br>", unsafe_allow_html=True)
 
-    df_reinc = (
-        df[df['Eh_Novo_Episodio'] == 1]
-        .groupby('Numero_Pedido')
-        .agg(
-            Atendimentos=('Eh_Novo_Episodio', 'count'),
-            Portal=('Portal', 'first'),
-            Motivo=('Motivo', lambda x: x.mode()[0] if len(x) > 0 else '-'),
-            Colaborador=('Colaborador', lambda x: ', '.join(x.unique()[:3]))
-        )
-        .reset_index()
-    )
-    df_reinc = df_reinc[df_reinc['Atendimentos'] > 1].sort_values('Atendimentos', ascending=False)
+    if isinstance(df, pd.DataFrame):
+        df_reinc = _calc(visao, 'reincidencia_50', lambda: reincidencia.tabela_reincidencia(df, top_n=50, contagem=contagem))
+    else:
+        df_reinc = _calc(visao, 'reincidencia_50', lambda: df.tabela_reincidencia(top_n=50, contagem=contagem))
 
     col_chart, col_table = st.columns([1, 2])
 
     with col_chart:
-        dist = df_reinc['Atendimentos'].value_counts().sort_index().reset_index()
-        dist.columns = ['Atendimentos', 'Pedidos']
-        dist['Label'] = dist['Atendimentos'].astype(str) + 'x'
-
-        fig_dist = go.Figure(go.Bar(
-            x=dist['Label'],
-            y=dist['Pedidos'],
-            marker=dict(
-                color=dist['Pedidos'],
-                colorscale=[[0, '#fef3c7'], [1, THEME['danger']]],
-                showscale=False,
-                cornerradius=6
-            ),
-            text=dist['Pedidos'],
-            textposition='outside',
-        ))
-        fig_dist.update_layout(
-            height=280,
-            xaxis=dict(title='Nº de atendimentos', showgrid=False),
-            yaxis=dict(title='Pedidos', showgrid=True, gridcolor=THEME['grid']),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(l=10, r=10, t=20, b=10)
-        )
-        st.plotly_chart(fig_dist, use_container_width=True)
+        dist = _calc(visao, 'distribuicao_reincidencia', lambda: metrics.distribuicao_reincidencia(reincidencia.atendimentos_reincidentes(contagem)))
+
+        def build(dist):
+            fig_dist = go.Figure(go.Bar(
+                x=dist['Label'],
+                y=dist['Pedidos'],
+                marker=dict(
+                    color=dist['Pedidos'],
+                    colorscale=[[0, '#fef3c7'], [1, THEME['danger']]],
+                    showscale=False,
+                    cornerradius=6
+                ),
+                text=dist['Pedidos'],
+                textposition='outside',
+            ))
+            fig_dist.update_layout(
+                height=280,
+                xaxis=dict(title='Nº de atendimentos', showgrid=False),
+                yaxis=dict(title='Pedidos', showgrid=True, gridcolor=THEME['grid']),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                margin=dict(l=10, r=10, t=20, b=10)
+            )
+            return fig_dist
+        st.plotly_chart(charts.cached_figure('distribuicao_reincidencia', dist, build), use_container_width=True)
 
     with col_table:
         if df_reinc.empty:
@@ -186,7 +172,7 @@ def render_pedidos_portal(df):
         else:
             st.markdown(f"""
                 <p style="font-size:13px; color:#6b7280; margin-bottom:8px;">
-                    Exibindo os <b>{min(50, len(df_reinc))}</b> pedidos com maior reincidência
+                    Exibindo os <b>{len(df_reinc)}</b> pedidos com maior reincidência
                 </p>
             """, unsafe_allow_html=True)
 
@@ -207,3 +193,12 @@ def render_pedidos_portal(df):
                 height=260,
                 hide_index=True
             )
+
+            # Tabela completa (todos os pedidos reincidentes), gerada só ao baixar
+            if isinstance(df, pd.DataFrame):
+                tabela_completa = lambda: reincidencia.tabela_reincidencia(df, contagem=contagem)
+            else:
+                tabela_completa = lambda: df.tabela_reincidencia(contagem=contagem)
+            nome = "reincidencia" if visao is None else f"reincidencia_{visao.filtro.start:%Y%m%d}_{visao.filtro.end:%Y%m%d}"
+            st.caption(f"Baixar a tabela completa ({pedidos_reincidentes:,} pedidos)")
+            export.render_download_buttons(nome, lambda: export.iter_frame(tabela_completa()), key="exportar_reincidencia")
@@ -0,0 +1,231 @@
+import glob
+import os
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+from modules import reincidencia, snapshot_store, tma_sketch
+from modules.rollups import GRAO
+
+try:
+    import duckdb
+except ImportError:  # Backend opcional: sem o pacote, o painel segue com o pandas
+    duckdb = None
+
+# Base processada exportada em Parquet (um arquivo por versão) e consultada pelo
+# DuckDB, embutido no processo e sem servidor. Filtros e agrupamentos rodam no
+# DuckDB; só os resultados agregados de cada seleção viram DataFrame.
+PREFIXO_PARQUET = "consulta"
+MAX_VERSOES_PARQUET = 2          # A versão anterior fica no disco para sessões que ainda a consultam
+LINHAS_POR_GRUPO = 100_000       # Base ordenada por Data: o filtro de período pula grupos inteiros
+
+def available():
+    return duckdb is not None
+
+def _nome(versao):
+    return f"{PREFIXO_PARQUET}-{versao}"
+
+def open_base(versao, base_dir=None):
+    """Base já exportada para esta versão dos dados, ou None."""
+    path = snapshot_store.parquet_path(_nome(versao), base_dir)
+    return ParquetBase(path, versao) if os.path.exists(path) else None
+
+def export_base(df, versao, base_dir=None):
+    """Exporta a base processada (na ordem da base) e descarta os arquivos de versões antigas."""
+    path = snapshot_store.save_parquet_snapshot(df, _nome(versao), base_dir, row_group_size=LINHAS_POR_GRUPO)
+    antigos = sorted(glob.glob(snapshot_store.parquet_path(_nome("*"), base_dir)), key=os.path.getmtime, reverse=True)
+    for antigo in antigos[MAX_VERSOES_PARQUET:]:
+        if antigo != path:
+            try:
+                os.remove(antigo)
+            except OSError:
+                pass
+    return ParquetBase(path, versao)
+
+def _filtro_sql(filtro):
+    """Cláusula WHERE e parâmetros equivalentes a FilterSpec.apply (período inclusive, setores, analistas)."""
+    condicoes = ['"Data" >= ?', '"Data" < ?']
+    params = [pd.Timestamp(filtro.start), pd.Timestamp(filtro.end) + timedelta(days=1)]
+    for coluna, valores in (('Setor', filtro.setores), ('Colaborador', filtro.analistas)):
+        if valores:
+            condicoes.append(f'"{coluna}" IN ({", ".join("?" * len(valores))})')
+            params.extend(valores)
+    return ' AND '.join(condicoes), params
+
+def _categorizar(df, colunas):
+    # Texto como Categorical (categorias ordenadas), como na base processada
+    for c in colunas:
+        df[c] = df[c].astype('category')
+    return df
+
+class ParquetBase:
+    """
+    Base processada de uma versão, consultada direto do Parquet pelo DuckDB.
+
+    Substitui o DataFrame processado quando o backend "duckdb" está ativo: segue
+    a mesma convenção de versão (`attrs['versao']`), então passa pelo refresher e
+    pelos caches no lugar dele, sem manter as linhas em memória.
+    """
+
+    def __init__(self, path, versao):
+        if duckdb is None:
+            raise RuntimeError("O backend 'duckdb' requer o pacote duckdb (pip install duckdb).")
+        self.path = path
+        self.attrs = {'versao': versao}
+        self._con = duckdb.connect()
+        self._lock = threading.Lock()
+        self.fonte = "read_parquet('{}', file_row_number = true)".format(path.replace("'", "''"))
+        self.colunas = self.query(f"DESCRIBE SELECT * FROM {self.fonte}")['column_name'].tolist()
+        resumo = self.query(f'SELECT count(*) AS linhas, min("Data") AS inicio, max("Data") AS fim FROM {self.fonte}').iloc[0]
+        self._linhas = int(resumo['linhas'])
+        self._limites = (resumo['inicio'].date(), resumo['fim'].date())
+        self._opcoes = {}
+
+    def query(self, sql, params=None):
+        """Executa a consulta num cursor próprio (a conexão é compartilhada entre sessões/threads)."""
+        with self._lock:
+            cursor = self._con.cursor()
+        try:
+            return cursor.execute(sql, params or []).df()
+        finally:
+            cursor.close()
+
+    def iter_query(self, sql, params=None, linhas_por_bloco=100_000):
+        """Resultado da consulta em blocos (DataFrames), sem materializar tudo de uma vez."""
+        with self._lock:
+            cursor = self._con.cursor()
+        try:
+            leitor = cursor.execute(sql, params or []).fetch_record_batch(linhas_por_bloco)
+            vazio = True
+            for lote in leitor:
+                vazio = False
+                yield lote.to_pandas()
+            if vazio:
+                yield leitor.schema.empty_table().to_pandas()  # Ao menos um bloco, com as colunas
+        finally:
+            cursor.close()
+
+    def __len__(self):
+        return self._linhas
+
+    def date_bounds(self):
+        return self._limites
+
+    def filter_options(self, coluna):
+        """Valores distintos da coluna, em ordem alfabética (consultados uma vez por versão)."""
+        if coluna not in self._opcoes:
+            df = self.query(f'SELECT DISTINCT "{coluna}" AS v FROM {self.fonte} WHERE "{coluna}" IS NOT NULL ORDER BY v')
+            self._opcoes[coluna] = df['v'].tolist()
+        return self._opcoes[coluna]
+
+    def rollup(self, filtro):
+        """
+        Cubo da seleção (mesmas colunas e ordem de `rollups.build_rollup` seguido de
+        `filtro.apply`), agregado no DuckDB: os painéis leem só este resultado.
+        """
+        grao = [c for c in GRAO if c in self.colunas]
+        where, params = _filtro_sql(filtro)
+        colunas = ', '.join('date_trunc(\'day\', "Data") AS "Data"' if c == 'Data' else f'"{c}"' for c in grao)
+        cubo = self.query(f"""
+            SELECT {colunas},
+                   count(*) AS Registros,
+                   CAST(sum("Eh_Novo_Episodio") AS BIGINT) AS Episodios,
+                   coalesce(sum("TMA_Valido"), 0) AS TMA_Soma,
+                   count("TMA_Valido") AS TMA_Qtd,
+                   min("Data_Completa") AS Primeira_Entrada
+            FROM {self.fonte}
+            WHERE {where}
+            GROUP BY ALL
+            ORDER BY "Data", min(file_row_number)
+        """, params)
+        return _categorizar(cubo, [c for c in grao if c != 'Data'])
+
+    def tma_sketches(self, filtro):
+        """
+        Sketches de TMA da seleção (mesmas faixas de `tma_sketch.build_sketches`): a
+        contagem por Colaborador x dia x Setor x faixa sai do DuckDB já agregada.
+        """
+        where, params = _filtro_sql(filtro)
+        limites = tma_sketch.LIMITES.tolist()
+        contagens = self.query(f"""
+            WITH faixas AS (
+                SELECT unnest(?::DOUBLE[]) AS inicio, unnest(?::DOUBLE[]) AS fim, unnest(range(?)) AS "Faixa"
+            )
+            SELECT "Data", "Colaborador", "Setor", "Faixa", count(*) AS "Qtd"
+            FROM {self.fonte} JOIN faixas ON "TMA_Valido" > inicio AND "TMA_Valido" <= fim
+            WHERE {where}
+            GROUP BY ALL
+            ORDER BY "Data"
+        """, [limites[:-1], limites[1:], tma_sketch.N_FAIXAS] + params)
+        return tma_sketch.from_counts(_categorizar(contagens, ['Colaborador', 'Setor']))
+
+class Selecao:
+    """
+    Linhas de uma seleção (FilterSpec) da ParquetBase, no lugar de `filtro.apply(df)`.
+    Não materializa as linhas: responde às consultas por pedido do painel de
+    Pedidos & Portais com agregações no DuckDB.
+    """
+
+    def __init__(self, base, filtro):
+        self.base = base
+        self.filtro = filtro
+        self.columns = base.colunas
+        self._linhas = None
+
+    def _where(self):
+        return _filtro_sql(self.filtro)
+
+    def __len__(self):
+        if self._linhas is None:
+            where, params = self._where()
+            self._linhas = int(self.base.query(f"SELECT count(*) AS n FROM {self.base.fonte} WHERE {where}", params)['n'].iloc[0])
+        return self._linhas
+
+    def iter_chunks(self, colunas, linhas_por_bloco=100_000):
+        """Linhas da seleção em blocos, só com `colunas`, na ordem da base (preserve_insertion_order)."""
+        where, params = self._where()
+        selecionadas = ', '.join(f'"{c}"' for c in colunas if c in self.columns)
+        return self.base.iter_query(f"SELECT {selecionadas} FROM {self.base.fonte} WHERE {where}", params, linhas_por_bloco)
+
+    def resumo_pedidos(self):
+        """Mesmo resultado de `reincidencia.resumo_pedidos` sobre as linhas da seleção."""
+        where, params = self._where()
+        r = self.base.query(f"""
+            SELECT count(*) AS pedidos, count(*) FILTER (WHERE atendimentos > 1) AS reincidentes
+            FROM (SELECT sum("Eh_Novo_Episodio") AS atendimentos FROM {self.base.fonte} WHERE {where} GROUP BY "Numero_Pedido")
+        """, params).iloc[0]
+        total_pedidos, pedidos_reincidentes = int(r['pedidos']), int(r['reincidentes'])
+        taxa_reincidencia = (pedidos_reincidentes / total_pedidos * 100) if total_pedidos > 0 else 0
+        return total_pedidos, pedidos_reincidentes, taxa_reincidencia
+
+    def contagem_reincidentes(self):
+        """
+        `reincidencia.contagem_por_pedido` restrita aos pedidos com mais de um
+        atendimento: é tudo o que a distribuição e a tabela de reincidência usam.
+        """
+        where, params = self._where()
+        contagem = self.base.query(f"""
+            SELECT "Numero_Pedido", count(*) AS Linhas, CAST(sum("Eh_Novo_Episodio") AS BIGINT) AS Atendimentos
+            FROM {self.base.fonte}
+            WHERE {where}
+            GROUP BY "Numero_Pedido"
+            HAVING sum("Eh_Novo_Episodio") > 1
+        """, params)
+        return contagem.set_index('Numero_Pedido')
+
+    def tabela_reincidencia(self, top_n=None, contagem=None):
+        """`reincidencia.tabela_reincidencia`, lendo só as linhas dos pedidos que entram na tabela."""
+        if contagem is None:
+            contagem = self.contagem_reincidentes()
+        pedidos = reincidencia.atendimentos_reincidentes(contagem)
+        if top_n is not None:
+            pedidos = pedidos.head(top_n)
+        where, params = self._where()
+        linhas = self.base.query(f"""
+            SELECT "Numero_Pedido", "Portal", "Motivo", "Colaborador", "Eh_Novo_Episodio"
+            FROM {self.base.fonte}
+            WHERE {where} AND "Eh_Novo_Episodio" = 1 AND "Numero_Pedido" IN (SELECT unnest(?::VARCHAR[]))
+            ORDER BY file_row_number
+        """, params + [pedidos.index.astype(str).tolist()])
+        return reincidencia.tabela_reincidencia(linhas, top_n, contagem)
@@ -0,0 +1,86 @@
+import threading
+import time
+
+class BackgroundRefresher:
+    """
+    Atualiza os dados em uma thread de fundo e troca a versão servida de uma vez
+    (stale-while-revalidate): enquanto a atualização roda, todas as sessões continuam
+    recebendo a última versão boa. Uma falha mantém a versão anterior e fica em `erro`.
+
+    `load(force)` devolve (DataFrame, time.time() da leitura da fonte). A primeira
+    carga usa force=False (pode vir do snapshot local); as atualizações, force=True.
+    """
+
+    def __init__(self, load, intervalo):
+        self._load = load
+        self.intervalo = intervalo
+        self.df = None
+        self.obtido_em = None        # Quando a fonte foi lida pela última vez com sucesso
+        self.duracao = None          # Duração da última carga (s)
+        self.erro = None             # Última falha (limpa no próximo sucesso)
+        self.em_andamento = False
+        self.geracao = 0             # Cargas concluídas (com ou sem sucesso)
+        self._carga = threading.Lock()
+        self._fim_carga = threading.Condition()
+        self._pedido = threading.Event()
+        self._thread = None
+
+    def _run(self, force):
+        with self._carga:
+            if not force and self.df is not None:
+                return  # Outra sessão concluiu a primeira carga enquanto esta esperava
+            self.em_andamento = True
+            inicio = time.perf_counter()
+            try:
+                df, obtido_em = self._load(force)
+                # Troca atômica: quem já leu a versão anterior continua com ela
+                self.df, self.obtido_em, self.erro = df, obtido_em, None
+            except Exception as e:
+                self.erro = e
+                if self.df is None:
+                    raise
+            finally:
+                self.duracao = time.perf_counter() - inicio
+                self.em_andamento = False
+                with self._fim_carga:
+                    self.geracao += 1
+                    self._fim_carga.notify_all()
+
+    def _loop(self):
+        while True:
+            self._pedido.wait(self.intervalo)
+            self._pedido.clear()
+            try:
+                self._run(force=True)
+            except Exception:
+                pass  # Registrado em self.erro; a versão anterior continua servida
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="dashboard-refresher", daemon=True)
+            self._thread.start()
+
+    def current(self):
+        """Versão atual dos dados; na primeira chamada carrega de forma síncrona."""
+        if self.df is None:
+            self._run(force=False)
+        self._start()
+        return self.df
+
+    def refresh(self, timeout=None):
+        """Pede uma atualização imediata à thread de fundo e espera até `timeout` segundos por ela."""
+        self._start()
+        with self._fim_carga:
+            alvo = self.geracao + (2 if self.em_andamento else 1)  # uma carga em curso pode ter lido dados antigos
+            self._pedido.set()
+            self._fim_carga.wait_for(lambda: self.geracao >= alvo, timeout)
+        return self.df
+
+    def status(self):
+        return {
+            'idade_s': None if self.obtido_em is None else time.time() - self.obtido_em,
+            'duracao_s': self.duracao,
+            'em_andamento': self.em_andamento,
+            'erro': None if self.erro is None else str(self.erro),
+            'versao': None if self.df is None else self.df.attrs.get('versao'),
+        }
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from modules.filters import category_mask
+
+# Reincidência por pedido: um único agrupamento (contagem_por_pedido) alimenta os
+# KPIs, a distribuição e a tabela; motivo principal e colaboradores são calculados
+# só para os pedidos que entram na tabela.
+# Portal e Colaborador seguem a ordem da base processada, que é cronológica: o
+# portal é o do primeiro atendimento e os colaboradores aparecem na ordem em que
+# atenderam. Quando a base era ordenada por Colaborador, o portal vinha do
+# colaborador de menor nome e a lista saía em ordem alfabética, então a tabela
+# difere da antiga em boa parte dos pedidos (mesmos pedidos, atendimentos e motivos).
+
+def contagem_por_pedido(df):
+    """Por pedido: linhas no período e atendimentos (episódios novos)."""
+    return df.groupby('Numero_Pedido', observed=True, sort=False)['Eh_Novo_Episodio'].agg(Linhas='size', Atendimentos='sum')
+
+def atendimentos_reincidentes(contagem):
+    """Atendimentos dos pedidos com mais de um atendimento (maiores primeiro; empates em ordem de pedido)."""
+    atendimentos = contagem.loc[contagem['Atendimentos'] > 1, 'Atendimentos'].sort_index()
+    return atendimentos.sort_values(ascending=False, kind='stable')
+
+def resumo_pedidos(df, contagem=None):
+    """Pedidos únicos, pedidos com mais de um atendimento e taxa de reincidência (%)."""
+    if contagem is None:
+        contagem = contagem_por_pedido(df)
+    total_pedidos = len(contagem)
+    pedidos_reincidentes = int((contagem['Atendimentos'] > 1).sum())
+    taxa_reincidencia = (pedidos_reincidentes / total_pedidos * 100) if total_pedidos > 0 else 0
+    return total_pedidos, pedidos_reincidentes, taxa_reincidencia
+
+def _motivo_principal(eps):
+    # Moda por pedido; no empate fica o menor motivo (como Series.mode()[0])
+    freq = eps.groupby(['Numero_Pedido', 'Motivo'], observed=True, sort=False).size().reset_index(name='n')
+    freq = freq.sort_values(['n', 'Motivo'], ascending=[False, True], kind='stable').drop_duplicates('Numero_Pedido')
+    return pd.Series(freq['Motivo'].to_numpy(), index=freq['Numero_Pedido'].to_numpy())
+
+def _primeiros_colaboradores(eps, n=3):
+    # Até `n` colaboradores distintos por pedido, na ordem em que atenderam, unidos por ", "
+    colabs = eps[['Numero_Pedido', 'Colaborador']].drop_duplicates()
+    posicao = colabs.groupby('Numero_Pedido', observed=True).cumcount().to_numpy()
+    pedidos = colabs['Numero_Pedido'].to_numpy()
+    nomes_colab = colabs['Colaborador'].astype(str).to_numpy(dtype=object)
+
+    nomes = pd.Series(nomes_colab[posicao == 0], index=pedidos[posicao == 0])
+    for k in range(1, n):
+        extra = pd.Series(nomes_colab[posicao == k], index=pedidos[posicao == k])
+        nomes = nomes + (', ' + extra).reindex(nomes.index, fill_value='')
+    return nomes
+
+def tabela_reincidencia(df, top_n=None, contagem=None):
+    """
+    Pedidos com mais de um atendimento, do mais reincidente para o menos: portal
+    (primeiro atendimento), motivo principal e até 3 colaboradores envolvidos.
+    Com `top_n`, só os N primeiros pedidos são detalhados.
+    """
+    if contagem is None:
+        contagem = contagem_por_pedido(df)
+    atendimentos = atendimentos_reincidentes(contagem)
+    if top_n is not None:
+        atendimentos = atendimentos.head(top_n)
+    pedidos = np.asarray(atendimentos.index, dtype=object)
+
+    mask = (df['Eh_Novo_Episodio'] == 1).to_numpy() & category_mask(df['Numero_Pedido'], pedidos)
+    eps = df.loc[mask, ['Numero_Pedido', 'Portal', 'Motivo', 'Colaborador']]
+    primeiros = eps.drop_duplicates('Numero_Pedido')
+    portal = pd.Series(primeiros['Portal'].to_numpy(), index=primeiros['Numero_Pedido'].to_numpy())
+
+    return pd.DataFrame({
+        'Numero_Pedido': pedidos,
+        'Atendimentos': atendimentos.to_numpy(),
+        'Portal': portal.reindex(pedidos).to_numpy(),
+        'Motivo': _motivo_principal(eps).reindex(pedidos).to_numpy(),
+        'Colaborador': _primeiros_colaboradores(eps).reindex(pedidos).to_numpy(),
+    })
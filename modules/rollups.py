@@ -0,0 +1,98 @@
+import numpy as np
+
+from modules import business_logic
+from modules.business_logic import contains_upper
+
+# Grão do cubo: uma linha por Colaborador x dia x Setor x Hora x Portal x Motivo.
+# Data entra no cubo como o dia (sem hora): sem coluna Hora, ou com datas no
+# formato '%d/%m/%Y %H:%M:%S', a Data da base carrega a hora do contato.
+# Dia_Semana depende só da Data, então entra no grão sem multiplicar linhas.
+GRAO = ['Data', 'Dia_Semana', 'Colaborador', 'Setor', 'Hora_Cheia', 'Portal', 'Motivo']
+
+# ==============================================================================
+# CONSTRUÇÃO (uma vez por versão dos dados)
+# ==============================================================================
+def build_rollup(df):
+    """
+    Agrega a base processada no grão do cubo com medidas aditivas:
+    Registros, Episodios, TMA_Soma e TMA_Qtd, mais a Primeira_Entrada (mínimo).
+    O resultado fica ordenado por Data, como a base, e aceita os mesmos filtros.
+    """
+    grao = [df['Data'].dt.normalize() if c == 'Data' else c for c in GRAO if c in df.columns]
+    cubo = df.groupby(grao, observed=True, sort=False).agg(
+        Registros=('Eh_Novo_Episodio', 'size'),
+        Episodios=('Eh_Novo_Episodio', 'sum'),
+        TMA_Soma=('TMA_Valido', 'sum'),
+        TMA_Qtd=('TMA_Valido', 'count'),
+        Primeira_Entrada=('Data_Completa', 'min'),
+    ).reset_index()
+    return cubo.sort_values(by='Data', kind='stable', ignore_index=True)
+
+def is_rollup(df):
+    return 'Registros' in df.columns
+
+def as_rollup(df):
+    """Aceita tanto o cubo quanto linhas (ex.: chamadas antigas dos painéis)."""
+    return df if is_rollup(df) else build_rollup(df)
+
+# ==============================================================================
+# CONSULTAS DOS PAINÉIS (sobre o cubo já filtrado)
+# ==============================================================================
+def kpis(cubo):
+    """Volume bruto, atendimentos líquidos, taxa de duplicidade e realizado por setor."""
+    total_bruto = int(cubo['Registros'].sum())
+    total_liquido = int(cubo['Episodios'].sum())
+    taxa_duplicidade = ((total_bruto - total_liquido) / total_bruto * 100) if total_bruto > 0 else 0
+    realizado_sac = int(cubo.loc[contains_upper(cubo['Setor'], 'SAC'), 'Episodios'].sum())
+    realizado_pend = int(cubo.loc[contains_upper(cubo['Setor'], 'PEND'), 'Episodios'].sum())
+    return {
+        'total_bruto': total_bruto,
+        'total_liquido': total_liquido,
+        'taxa_duplicidade': taxa_duplicidade,
+        'realizado_sac': realizado_sac,
+        'realizado_pend': realizado_pend,
+    }
+
+def metas(cubo, jornada=business_logic.JORNADA):
+    """Metas de SAC/Pendência a partir da primeira entrada de cada Colaborador x dia x Setor."""
+    dia = cubo['Data'].dt.normalize()  # Presença por dia, mesmo que a Data do cubo venha com hora
+    df_presenca = cubo.groupby(['Colaborador', dia, 'Setor'], observed=True)['Primeira_Entrada'].min().reset_index()
+    df_presenca.insert(1, 'Data_Str', df_presenca.pop('Data').dt.strftime('%d/%m/%Y'))
+    df_presenca.rename(columns={'Primeira_Entrada': 'Hora_Entrada'}, inplace=True)
+    return business_logic.compute_metas(df_presenca, jornada)
+
+def ranking(cubo, n=5):
+    """Top N colaboradores por atendimentos (episódios novos)."""
+    df_rank = cubo.groupby('Colaborador', observed=True)['Episodios'].sum()
+    df_rank = df_rank[df_rank > 0].rename('Total').reset_index()
+    return df_rank.sort_values('Total', ascending=False, kind='stable').head(n).reset_index(drop=True)
+
+def dias_no_periodo(cubo):
+    return max(cubo['Data'].nunique(), 1)
+
+def stats_colaborador(cubo):
+    """Por colaborador: episódios (Liquido), TMA médio e quantidade de TMAs válidos."""
+    df = cubo.groupby('Colaborador', observed=True).agg(
+        Liquido=('Episodios', 'sum'),
+        TMA_Soma=('TMA_Soma', 'sum'),
+        TMA_Qtd=('TMA_Qtd', 'sum'),
+    ).reset_index()
+    df['TMA'] = df['TMA_Soma'] / df['TMA_Qtd'].replace(0, np.nan)
+    return df
+
+def heatmap(cubo):
+    """Registros por Dia_Semana x Hora_Cheia."""
+    return cubo.groupby(['Dia_Semana', 'Hora_Cheia'], observed=True)['Registros'].sum().reset_index(name='Atendimentos')
+
+def volume_portal(cubo):
+    """Atendimentos por Portal (apenas portais com atendimento)."""
+    df = cubo.groupby('Portal', observed=True)['Episodios'].sum()
+    return df[df > 0].rename('Volume').reset_index()
+
+def volume_portal_motivo(cubo):
+    """Atendimentos por Portal x Motivo (apenas combinações com atendimento)."""
+    df = cubo.groupby(['Portal', 'Motivo'], observed=True)['Episodios'].sum()
+    return df[df > 0].rename('Volume').reset_index()
+
+def portais_ativos(cubo):
+    return cubo['Portal'].nunique()
@@ -0,0 +1,191 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+from modules import snapshot_store
+
+# Leitura de várias abas da planilha (ex.: uma por mês ou por equipe) em paralelo,
+# sobre uma única conexão. Cada aba tem seu prazo e suas tentativas; o resultado é
+# uma base só, com o mesmo esquema, e um relatório de tempo por aba.
+ABAS_PADRAO = ("Página1",)
+MAX_PARALELAS = 4
+TIMEOUT_ABA = 60          # segundos por tentativa
+TENTATIVAS = 2
+ESPERA_ENTRE_TENTATIVAS = 1.0
+
+class WorksheetError(RuntimeError):
+    """Falha na leitura de uma ou mais abas (depois das tentativas); `relatorio` traz o detalhe por aba."""
+
+    def __init__(self, mensagem, relatorio):
+        super().__init__(mensagem)
+        self.relatorio = relatorio
+
+class LocalSheetsConnection:
+    """
+    Substituto local da conexão do Google Sheets (mesmo `read(worksheet=...)`), para
+    rodar e testar a leitura de várias abas sem rede. `path` é uma pasta com um
+    arquivo por aba (<aba>.csv, .xlsx, .parquet ou .arrow) ou uma pasta de trabalho
+    Excel com uma planilha por aba. `atraso` simula a latência de cada leitura.
+    """
+
+    EXTENSOES = (".csv", ".xlsx", ".xls", ".parquet", ".arrow", ".feather")
+
+    def __init__(self, path, atraso=0.0):
+        self.path = path
+        self.atraso = atraso
+
+    def _arquivo(self, worksheet):
+        if worksheet is None:
+            arquivos = sorted(f for f in os.listdir(self.path) if f.lower().endswith(self.EXTENSOES))
+            if not arquivos:
+                raise FileNotFoundError(f"Nenhuma aba em {self.path}")
+            return os.path.join(self.path, arquivos[0])
+        for ext in self.EXTENSOES:
+            arquivo = os.path.join(self.path, worksheet + ext)
+            if os.path.exists(arquivo):
+                return arquivo
+        raise FileNotFoundError(f"Aba não encontrada: {worksheet!r} em {self.path}")
+
+    def read(self, worksheet=None, ttl=None, dtype=None, skiprows=None, **kwargs):
+        if self.atraso:
+            time.sleep(self.atraso)
+        if os.path.isdir(self.path):
+            arquivo = self._arquivo(worksheet)
+            if arquivo.lower().endswith(".csv"):
+                return pd.read_csv(arquivo, dtype=dtype, skiprows=skiprows)
+            df = snapshot_store.read_local_source(arquivo)
+        else:
+            df = pd.read_excel(self.path, sheet_name=worksheet or 0, dtype=dtype)
+        if skiprows is not None:
+            df = df.iloc[len(skiprows):]
+        return df.astype(dtype).where(df.notna(), None) if dtype is not None else df
+
+# ==============================================================================
+# LEITURA POR INTERVALO
+# ==============================================================================
+def _planilha_api(conn):
+    """Cliente com acesso às abas pela API (conta de serviço), ou None (link público ou conexão local)."""
+    cliente = getattr(conn, 'client', None)
+    return cliente if hasattr(cliente, '_select_worksheet') else None
+
+def supports_ranged_read(conn):
+    """Se `conn` lê só as linhas a partir de uma posição, sem baixar a aba inteira."""
+    return _planilha_api(conn) is not None
+
+def _ler_intervalo(cliente, aba, inicio, dtype=None):
+    # Cabeçalho + linhas A{inicio + 2}:<última coluna> direto da API. As linhas vazias
+    # no meio são mantidas para a posição continuar sendo a linha da planilha.
+    planilha = cliente._select_worksheet(worksheet=aba)
+    cabecalho = planilha.row_values(1)
+    if not cabecalho:
+        return pd.DataFrame()
+    ultima_coluna = rowcol_to_a1(1, len(cabecalho))[:-1]
+    valores = planilha.get(f"A{inicio + 2}:{ultima_coluna}")
+    df = pd.DataFrame([linha + [''] * (len(cabecalho) - len(linha)) for linha in valores], columns=cabecalho, dtype=object)
+    df = df.where(df != '')
+    return df.astype(dtype) if dtype is not None else df
+
+def read_worksheet(conn, aba, inicio=None, **read_kwargs):
+    """
+    Lê a aba `aba`. Com `inicio` (0 = primeira linha de dados), só as linhas a partir
+    dessa posição: com conta de serviço, o intervalo é pedido à API da planilha e só
+    as linhas novas trafegam; no link público (e na conexão local) a aba inteira é
+    baixada e as linhas anteriores são descartadas na leitura (skiprows).
+    """
+    if inicio is None:
+        return conn.read(worksheet=aba, **read_kwargs)
+    cliente = _planilha_api(conn)
+    if cliente is not None:
+        return _ler_intervalo(cliente, aba, inicio, read_kwargs.get('dtype'))
+    return conn.read(worksheet=aba, skiprows=range(1, inicio + 1) if inicio else None, **read_kwargs)
+
+# ==============================================================================
+# LEITURA EM PARALELO
+# ==============================================================================
+def _ler(conn, aba, espera, read_kwargs):
+    if espera:
+        time.sleep(espera)  # Intervalo antes de uma nova tentativa (sem travar as demais abas)
+    inicio = time.perf_counter()
+    df = read_worksheet(conn, aba, **read_kwargs)
+    return df, time.perf_counter() - inicio
+
+def align_frames(frames):
+    """
+    Junta as abas em uma base só: colunas na ordem em que aparecem (faltantes ficam
+    vazias) e, quando uma coluna veio com tipos diferentes entre abas, ela vira texto
+    em todas, como a planilha é lida no modo incremental.
+    """
+    frames = [df.rename(columns=lambda c: str(c).strip()) for df in frames]
+    colunas = list(dict.fromkeys(c for df in frames for c in df.columns))
+    for c in colunas:
+        tipos = {str(df[c].dtype) for df in frames if c in df.columns and df[c].notna().any()}
+        if len(tipos) > 1:
+            frames = [df.assign(**{c: df[c].astype(str).where(df[c].notna(), None)}) if c in df.columns else df for df in frames]
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    return pd.concat(frames, ignore_index=True)[colunas]
+
+def fetch_worksheets(conn, abas=ABAS_PADRAO, max_paralelas=MAX_PARALELAS, timeout=TIMEOUT_ABA,
+                     tentativas=TENTATIVAS, espera=ESPERA_ENTRE_TENTATIVAS, **read_kwargs):
+    """
+    Lê as `abas` de `conn` ao mesmo tempo (até `max_paralelas`), com até `tentativas`
+    leituras por aba de no máximo `timeout` segundos cada. Retorna (base com as abas
+    na ordem de `abas`, relatório por aba: linhas, segundos, tentativas e erro).
+    Se alguma aba falhar em todas as tentativas, levanta WorksheetError: uma base
+    parcial viraria uma nova versão dos dados com números errados.
+    `read_kwargs` (inclusive `inicio`, ver read_worksheet) valem para cada aba.
+    """
+    abas = list(abas)
+    if not abas:
+        raise ValueError("Nenhuma aba configurada para leitura.")
+    relatorio = {aba: {'aba': aba, 'linhas': None, 'tempo_s': None, 'tentativas': 0, 'erro': None} for aba in abas}
+    resultados = {}
+    # Uma leitura que estoura o prazo não pode ser interrompida e segue ocupando a sua
+    # thread; o pool tem folga para elas, e o limite de paralelas vale só para as ativas
+    pool = ThreadPoolExecutor(max_workers=len(abas) * tentativas or 1, thread_name_prefix="aba")
+    fila = deque((aba, 1) for aba in abas)
+    ativas = {}  # aba -> (futuro, prazo, tentativa)
+
+    try:
+        while fila or ativas:
+            while fila and len(ativas) < max_paralelas:
+                aba, n = fila.popleft()
+                atraso = espera * (n - 1)
+                relatorio[aba]['tentativas'] = n
+                ativas[aba] = (pool.submit(_ler, conn, aba, atraso, read_kwargs), time.monotonic() + atraso + timeout, n)
+            limite = max(0.0, min(prazo for _, prazo, _ in ativas.values()) - time.monotonic())
+            wait([f for f, _, _ in ativas.values()], timeout=limite, return_when=FIRST_COMPLETED)
+            agora = time.monotonic()
+            for aba, (futuro, prazo, n) in list(ativas.items()):
+                if futuro.done():
+                    try:
+                        df, duracao = futuro.result()
+                    except Exception as e:
+                        erro = e
+                    else:
+                        resultados[aba] = df
+                        relatorio[aba].update(linhas=len(df), tempo_s=duracao, erro=None)
+                        del ativas[aba]
+                        continue
+                elif agora >= prazo:
+                    futuro.cancel()  # Se já começou, o resultado só é descartado
+                    erro = TimeoutError(f"sem resposta em {timeout:g}s")
+                else:
+                    continue
+                del ativas[aba]
+                relatorio[aba]['erro'] = f"{type(erro).__name__}: {erro}"
+                if n < tentativas:
+                    fila.append((aba, n + 1))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    relatorio = [relatorio[aba] for aba in abas]
+    falhas = [r for r in relatorio if r['linhas'] is None]
+    if falhas:
+        detalhes = "; ".join(f"{r['aba']} ({r['erro']})" for r in falhas)
+        raise WorksheetError(f"Falha ao ler {len(falhas)} de {len(abas)} aba(s): {detalhes}", relatorio)
+    return align_frames([resultados[aba] for aba in abas]), relatorio
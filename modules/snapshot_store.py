@@ -0,0 +1,136 @@
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+# Diretório dos snapshots locais (pode ser trocado por variável de ambiente)
+SNAPSHOT_DIR = os.environ.get("DASHBOARD_SNAPSHOT_DIR", ".snapshots")
+
+def _paths(name, base_dir=None):
+    base = base_dir or SNAPSHOT_DIR
+    return os.path.join(base, f"{name}.arrow"), os.path.join(base, f"{name}.json")
+
+def _arrow_safe(df):
+    """Converte colunas de texto com tipos misturados (ex.: números e textos da planilha) para string."""
+    out = df
+    for col in df.columns:
+        if df[col].dtype == object:
+            try:
+                pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                if out is df:
+                    out = df.copy()
+                out[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return out
+
+def save_snapshot(df, name, base_dir=None, preserve_index=False, **meta):
+    """
+    Grava o DataFrame em formato Arrow IPC (sem compressão, mapeável em memória).
+    A escrita é atômica: o arquivo anterior só é substituído ao final.
+    """
+    arrow_path, meta_path = _paths(name, base_dir)
+    os.makedirs(os.path.dirname(arrow_path) or ".", exist_ok=True)
+
+    table = pa.Table.from_pandas(_arrow_safe(df), preserve_index=preserve_index)
+    tmp_path = arrow_path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, arrow_path)
+
+    info = {"linhas": len(df), "salvo_em": time.time(), **{k: v for k, v in df.attrs.items() if isinstance(v, (str, int, float))}, **meta}
+    tmp_meta = meta_path + ".tmp"
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump(info, f)
+    os.replace(tmp_meta, meta_path)
+    return info
+
+def parquet_path(name, base_dir=None):
+    return os.path.join(base_dir or SNAPSHOT_DIR, f"{name}.parquet")
+
+def save_parquet_snapshot(df, name, base_dir=None, row_group_size=100_000):
+    """
+    Grava o DataFrame em Parquet (colunar, com min/max por grupo de linhas, o que
+    permite a um motor de consultas pular blocos inteiros). Escrita atômica.
+    """
+    import pyarrow.parquet as pq
+    path = parquet_path(name, base_dir)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    table = pa.Table.from_pandas(_arrow_safe(df), preserve_index=False)
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, row_group_size=row_group_size)
+    os.replace(tmp_path, path)
+    return path
+
+def load_snapshot_meta(name, base_dir=None):
+    """Metadados do snapshot (versão, linhas, data de gravação) ou None se não existir."""
+    arrow_path, meta_path = _paths(name, base_dir)
+    if not (os.path.exists(arrow_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_snapshot(name, base_dir=None):
+    """Lê o snapshot via memory-map. Retorna None se não existir ou estiver corrompido."""
+    meta = load_snapshot_meta(name, base_dir)
+    if meta is None:
+        return None
+    arrow_path, _ = _paths(name, base_dir)
+    try:
+        with pa.memory_map(arrow_path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+    df = table.to_pandas()
+    if "versao" in meta:
+        df.attrs["versao"] = meta["versao"]
+    return df
+
+def snapshot_age(name, base_dir=None):
+    """Idade do snapshot em segundos (None se não existir)."""
+    meta = load_snapshot_meta(name, base_dir)
+    return None if meta is None else time.time() - meta.get("salvo_em", 0)
+
+def read_local_source(path):
+    """Fonte de dados local (CSV, Excel, Parquet ou Arrow) que substitui o Google Sheets."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return pd.read_csv(path)
+    if ext in (".xlsx", ".xls"):
+        return pd.read_excel(path)
+    if ext == ".parquet":
+        return pd.read_parquet(path)
+    if ext in (".arrow", ".feather"):
+        return pd.read_feather(path)
+    raise ValueError(f"Formato de fonte local não suportado: {ext}")
+
+def iter_local_source(path, chunk_linhas=200_000):
+    """
+    Lê a fonte local em blocos de até `chunk_linhas` linhas, tudo como texto (como no
+    Google Sheets), para que todos os blocos tenham os mesmos tipos. O índice continua
+    de um bloco para o outro, como em fatias da base inteira.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        yield from pd.read_csv(path, dtype=str, chunksize=chunk_linhas)
+        return
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+        inicio = 0
+        for lote in pq.ParquetFile(path).iter_batches(batch_size=chunk_linhas):
+            df = lote.to_pandas()
+            df = df.astype(str).where(df.notna(), None)
+            df.index = pd.RangeIndex(inicio, inicio + len(df))
+            inicio += len(df)
+            yield df
+        return
+    # Excel/Arrow: sem leitura parcial, a base é lida inteira e entregue em fatias
+    df = read_local_source(path)
+    df = df.astype(str).where(df.notna(), None)
+    for inicio in range(0, len(df), chunk_linhas):
+        yield df.iloc[inicio:inicio + chunk_linhas]
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from modules.business_logic import TMA_MAX_MINUTOS, TMA_MIN_MINUTOS
+
+# Distribuição do TMA por Colaborador x dia x Setor em histogramas de faixas fixas.
+# As faixas são as mesmas para todos, então juntar dias, setores ou colaboradores é
+# só somar contagens: qualquer seleção sai dos sketches, sem voltar às linhas.
+# Faixas em escala logarítmica entre os limites do TMA válido (0,5 a 40 min): cada
+# uma cobre ~7% do valor, e os percentis são interpolados dentro da faixa.
+GRAO = ['Data', 'Colaborador', 'Setor']
+N_FAIXAS = 64
+LIMITES = np.geomspace(TMA_MIN_MINUTOS, TMA_MAX_MINUTOS, N_FAIXAS + 1)
+FAIXAS = [f"TMA_F{i:02d}" for i in range(N_FAIXAS)]
+QUANTIS = (0.5, 0.9, 0.99)
+
+def faixa(minutos):
+    """Índice da faixa de cada TMA: (LIMITES[i], LIMITES[i + 1]] -> i."""
+    return np.clip(np.searchsorted(LIMITES, minutos, side='left') - 1, 0, N_FAIXAS - 1)
+
+def _montar(chaves, faixas, qtd=None):
+    """Sketches (chaves do grão + contagens por faixa) a partir de pares (linha de `chaves`, faixa)."""
+    grao = [c for c in GRAO if c in chaves.columns]
+    if chaves.empty:
+        return pd.concat([chaves[grao].reset_index(drop=True), pd.DataFrame(columns=FAIXAS, dtype='int64')], axis=1)
+    grupos = chaves.groupby(grao, observed=True, sort=False).ngroup().to_numpy()
+    ids, primeiras = np.unique(grupos, return_index=True)
+    contagens = np.bincount(grupos * N_FAIXAS + faixas, weights=qtd, minlength=len(ids) * N_FAIXAS)
+    sketches = pd.concat([
+        chaves[grao].iloc[primeiras].reset_index(drop=True),
+        pd.DataFrame(contagens.reshape(len(ids), N_FAIXAS).astype('int64'), columns=FAIXAS),
+    ], axis=1)
+    return sketches.sort_values(by='Data', kind='stable', ignore_index=True)
+
+# ==============================================================================
+# CONSTRUÇÃO (uma vez por versão dos dados)
+# ==============================================================================
+def build_sketches(df):
+    """
+    Um histograma de TMA_Valido por Colaborador x dia x Setor (só quem tem TMA
+    válido). Ordenado por Data, como a base, e aceita os mesmos filtros (FilterSpec).
+    """
+    tma = df['TMA_Valido'].to_numpy(dtype='float64', na_value=np.nan)
+    validos = ~np.isnan(tma)
+    return _montar(df[validos], faixa(tma[validos]))
+
+def from_counts(df):
+    """Sketches a partir de contagens já agregadas: grão + 'Faixa' + 'Qtd' (ex.: consulta no DuckDB)."""
+    return _montar(df, df['Faixa'].to_numpy(dtype='int64'), df['Qtd'].to_numpy(dtype='float64'))
+
+# ==============================================================================
+# PERCENTIS
+# ==============================================================================
+def quantis(contagens, qs=QUANTIS):
+    """
+    Percentis `qs` de cada linha de `contagens` (matriz linhas x N_FAIXAS),
+    interpolados em escala logarítmica dentro da faixa. NaN onde não há TMAs.
+    """
+    contagens = np.atleast_2d(np.asarray(contagens, dtype='float64'))
+    acumulado = contagens.cumsum(axis=1)
+    total = acumulado[:, -1]
+    saida = np.full((len(contagens), len(qs)), np.nan)
+    linhas = np.arange(len(contagens))
+    for j, q in enumerate(qs):
+        alvo = q * total
+        b = np.minimum((acumulado < alvo[:, None]).sum(axis=1), N_FAIXAS - 1)
+        antes = np.where(b > 0, acumulado[linhas, b - 1], 0)
+        na_faixa = contagens[linhas, b]
+        fracao = np.divide(alvo - antes, na_faixa, out=np.zeros_like(alvo), where=na_faixa > 0)
+        valor = LIMITES[b] * (LIMITES[b + 1] / LIMITES[b]) ** np.clip(fracao, 0, 1)
+        saida[:, j] = np.where(total > 0, valor, np.nan)
+    return saida
+
+def _tabela(rotulos, coluna, contagens, qs):
+    df = pd.DataFrame({coluna: rotulos, 'TMA_Qtd': np.asarray(contagens).sum(axis=1).astype('int64')})
+    for q, valores in zip(qs, quantis(contagens, qs).T):
+        df[f"P{q * 100:g}"] = valores
+    return df
+
+def percentis(sketches, por=None, qs=QUANTIS):
+    """Percentis de TMA por `por` (ex.: 'Colaborador') ou da seleção inteira (uma linha)."""
+    if por is None:
+        return _tabela(['Total'], 'Grupo', sketches[FAIXAS].to_numpy().sum(axis=0, keepdims=True), qs)
+    df = sketches.groupby(por, observed=True)[FAIXAS].sum()
+    return _tabela(df.index, por, df.to_numpy(), qs)
+
+def percentis_colaborador(sketches, n=None, qs=QUANTIS, rotulo="Outros"):
+    """
+    Percentis por colaborador, do maior percentil `qs[1]` (ex.: P90) para o menor.
+    Com `n` > 0, os demais viram uma linha "Outros (k)" com os sketches somados
+    (percentis do grupo, não média dos percentis).
+    """
+    df = sketches.groupby('Colaborador', observed=True)[FAIXAS].sum()
+    contagens = df.to_numpy()
+    tabela = _tabela(df.index.astype(str), 'Colaborador', contagens, qs)
+    ordem = np.argsort(-np.nan_to_num(tabela[f"P{qs[min(1, len(qs) - 1)] * 100:g}"].to_numpy(), nan=-1), kind='stable')
+    tabela = tabela.iloc[ordem].reset_index(drop=True)
+    if not n or n <= 0 or len(tabela) <= n:
+        return tabela
+    resto = contagens[ordem[n:]].sum(axis=0, keepdims=True)
+    outros = _tabela([f"{rotulo} ({len(tabela) - n})"], 'Colaborador', resto, qs)
+    return pd.concat([tabela.head(n), outros], ignore_index=True)
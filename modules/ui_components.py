@@ -2,8 +2,8 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-import numpy as np
 from datetime import datetime
+from modules import charts, export, filters, instrumentation, intraday, metrics, pedidos_portal, rollups, tma_sketch
 
 # CONFIGURACAO DE PRESTIGIO
 THEME = {
@@ -55,7 +55,12 @@ def render_kpi_cards(total_bruto, total_liquido, taxa_duplicidade, media_meta):
     c3.markdown(card("Duplicidade", f"{taxa_duplicidade:.1f}%", "Alvo: < 15%", dup_color, "🔁"), unsafe_allow_html=True)
     c4.markdown(card("Meta Global", f"{media_meta:.1f}%", "Aproveitamento geral", meta_color, "🎯"), unsafe_allow_html=True)
 
-def render_sidebar_filters(df_raw):
+def _calc(visao, nome, compute):
+    # Com uma View, o resultado do painel vem do cache de seleções (ver data_loader.get_view)
+    return compute() if visao is None else visao.get(nome, compute)
+
+def render_sidebar_filters(df_raw, aplicar=None):
+    """Filtros da sidebar. `aplicar(filtro)` devolve as linhas filtradas (padrão: filtro.apply na base)."""
     with st.sidebar:
         st.markdown("""
             <div style='padding-bottom: 20px;'>
@@ -68,9 +73,9 @@ def render_sidebar_filters(df_raw):
         
         # Seletor de Datas em BR
         st.markdown("<p style='font-size:13px; font-weight:700; color:#1e293b; margin-bottom: -10px;'>📅 PERÍODO DE ANÁLISE</p>", unsafe_allow_html=True)
-        min_date = df_raw['Data'].min().date()
-        max_val = df_raw['Data'].max().date()
-        today = datetime.now().date()
+        min_date, max_val = filters.date_bounds(df_raw)
+        # Sem registros hoje (ex.: fim de semana) o padrão é o último dia com dados
+        today = min(datetime.now().date(), max_val)
         
         dr = st.date_input("", value=[today, today], min_value=min_date, max_value=max_val, format="DD/MM/YYYY")
         
@@ -78,20 +83,59 @@ def render_sidebar_filters(df_raw):
         
         # Filtros por Segmento
         st.markdown("<p style='font-size:13px; font-weight:700; color:#1e293b; margin-bottom: -10px;'>🔍 FILTROS OPERACIONAIS</p>", unsafe_allow_html=True)
-        setores = st.multiselect("Setores", options=sorted(df_raw['Setor'].unique()), placeholder="Todos os setores")
-        analistas = st.multiselect("Analistas", options=sorted(df_raw['Colaborador'].unique()), placeholder="Todos os analistas")
+        setores = st.multiselect("Setores", options=filters.column_options(df_raw, 'Setor'), placeholder="Todos os setores")
+        analistas = st.multiselect("Analistas", options=filters.column_options(df_raw, 'Colaborador'), placeholder="Todos os analistas")
+        st.number_input("Máx. colaboradores por gráfico", min_value=0, value=charts.MAX_CATEGORIAS, step=5, key=charts.CHAVE_MAX_CATEGORIAS, help="Os demais são agrupados em \"Outros\". 0 = mostrar todos.")
         
         st.markdown("---")
         
         if isinstance(dr, (list, tuple)) and len(dr) == 2: start, end = dr
         else: start = end = (dr[0] if isinstance(dr, (list, tuple)) else dr)
         
-        df = df_raw.copy()
-        df = df[(df['Data'].dt.date >= start) & (df['Data'].dt.date <= end)]
-        if setores: df = df[df['Setor'].isin(setores)]
-        if analistas: df = df[df['Colaborador'].isin(analistas)]
+        # Base ordenada por Data: o período vira uma fatia (busca binária), sem copiar a base
+        filtro = filters.FilterSpec(start, end, tuple(setores), tuple(analistas))
+        if aplicar is not None:
+            df = aplicar(filtro)
+        else:
+            with instrumentation.stage("filtro", df_raw) as etapa:
+                df = etapa.saida(filtro.apply(df_raw))
         
-        return df, end
+        return df, filtro
+
+def render_export(visao):
+    """Download das linhas da seleção atual (período, setores e analistas) na sidebar."""
+    with st.sidebar:
+        st.markdown("<p style='font-size:13px; font-weight:700; color:#1e293b; margin-bottom: -10px;'>⬇️ EXPORTAR SELEÇÃO</p>", unsafe_allow_html=True)
+        st.caption(f"{len(visao.df):,} linhas • {len(export.COLUNAS_SELECAO)} colunas")
+        filtro = visao.filtro
+        export.render_download_buttons(f"atendimentos_{filtro.start:%Y%m%d}_{filtro.end:%Y%m%d}", lambda: export.iter_selection(visao.df), key="exportar_selecao")
+        st.markdown("---")
+
+def render_data_status(status):
+    """Idade dos dados e duração da última atualização (abaixo do botão de atualizar)."""
+    idade = status['idade_s']
+    if idade is None:
+        texto_idade = "—"
+    elif idade < 60:
+        texto_idade = "agora"
+    elif idade < 3600:
+        texto_idade = f"há {idade / 60:.0f} min"
+    else:
+        texto_idade = f"há {idade / 3600:.1f} h"
+    duracao = f"{status['duracao_s']:.1f}s" if status['duracao_s'] is not None else "—"
+    andamento = " • atualizando..." if status['em_andamento'] else ""
+    st.caption(f"🕒 Dados de {texto_idade} • última atualização em {duracao}{andamento}")
+    if status['erro']:
+        st.caption(f"⚠️ Falha na última atualização (mantida a versão anterior): {status['erro']}")
+    abas = status.get('abas')
+    if abas and (len(abas) > 1 or abas[0]['erro']):
+        # Leitura em paralelo: tempo, linhas e tentativas de cada aba na última busca
+        with st.expander(f"📑 Abas da planilha ({len(abas)})"):
+            st.dataframe(
+                pd.DataFrame(abas, columns=['aba', 'linhas', 'tempo_s', 'tentativas', 'erro']),
+                hide_index=True, use_container_width=True,
+                column_config={'tempo_s': st.column_config.NumberColumn("s", format="%.2f")},
+            )
 
 def render_gauges(perc_sac, perc_pend, realizado_sac=0, meta_sac=0, realizado_pend=0, meta_pend=0):
     def gauge_card(title, perc, done, target, icon):
@@ -119,10 +163,51 @@ def render_gauges(perc_sac, perc_pend, realizado_sac=0, meta_sac=0, realizado_pe
     with c1: st.markdown(gauge_card("Setor SAC", perc_sac, realizado_sac, meta_sac, "📞"), unsafe_allow_html=True)
     with c2: st.markdown(gauge_card("Setor Pendencia", perc_pend, realizado_pend, meta_pend, "⏳"), unsafe_allow_html=True)
 
-def render_ranking_section(df):
+@st.fragment(run_every=intraday.INTERVALO_AO_VIVO)
+def render_live_panel(carregar, filtro, status=None):
+    """
+    Modo ao vivo: metas e realizado de hoje (setores/analistas da sidebar) e a curva
+    projetado x realizado por hora. `carregar()` devolve o cubo do dia, atualizado
+    só com as linhas novas; o fragmento se reexecuta sozinho a cada minuto (a
+    planilha só é relida quando vence o intervalo do modo ao vivo).
+    """
+    try:
+        cubo = carregar()
+    except Exception as e:
+        st.error(f"Erro ao atualizar o modo ao vivo: {e}")
+        return
+    dia = cubo.attrs['dia']
+    cubo = filters.FilterSpec(dia.date(), dia.date(), filtro.setores, filtro.analistas).apply(cubo)
+    kpis = rollups.kpis(cubo)
+    resumo = metrics.resumo_metas(kpis, rollups.metas(cubo))
+
+    agora = datetime.now()
+    info = status() if status is not None else {}
+    lido_em = datetime.fromtimestamp(info['lido_em']) if info.get('lido_em') else agora
+    novas = f" • {info['linhas_novas']:,} linhas novas na última leitura" if info.get('linhas_novas') is not None else ""
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown(f"<p style='font-size:16px; font-weight:800; color:#0f172a; margin-bottom:0;'>🔴 Ao Vivo • {dia:%d/%m/%Y}</p>", unsafe_allow_html=True)
+    st.caption(f"Planilha lida às {lido_em:%H:%M:%S}{novas}")
+    render_gauges(resumo['perc_sac'], resumo['perc_pend'], kpis['realizado_sac'], resumo['meta_total_sac'], kpis['realizado_pend'], resumo['meta_total_pend'])
+
+    # Meta distribuída pela jornada de cada presença x episódios acumulados até cada hora
+    curva = intraday.curva_horaria(cubo, agora=agora if dia.date() == agora.date() else None)
+
+    def build(curva):
+        fig = go.Figure()
+        for setor, nome, cor in (('SAC', 'SAC', THEME['primary']), ('PEND', 'Pendência', THEME['warning'])):
+            fig.add_trace(go.Scatter(x=curva['Hora_Cheia'], y=curva[f'Projetado_{setor}'].round(), name=f"{nome} projetado", mode='lines', line=dict(color=cor, width=2, dash='dash')))
+            fig.add_trace(go.Scatter(x=curva['Hora_Cheia'], y=curva[f'Realizado_{setor}'], name=f"{nome} realizado", mode='lines+markers', line=dict(color=cor, width=3)))
+        fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', height=380, margin=dict(l=10, r=10, t=10, b=10), xaxis=dict(title='Hora'), yaxis=dict(title='Atendimentos (acumulado)', gridcolor='#f1f5f9'), legend=dict(orientation='h', y=1.12))
+        return fig
+    st.markdown("<div class='kpi-card'><p style='font-size:16px; font-weight:800; color:#0f172a; margin-bottom:20px;'>📈 Projetado vs Realizado (hora a hora)</p>", unsafe_allow_html=True)
+    st.plotly_chart(charts.cached_figure('ao_vivo_curva', curva, build), use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+def render_ranking_section(df, visao=None):
     st.markdown("<h3 style='margin-top:40px; font-weight:800; color:#0f172a;'>🏆 Top Performance Recognition</h3>", unsafe_allow_html=True)
     
-    df_rank = df[df['Eh_Novo_Episodio'] == 1].groupby('Colaborador').size().reset_index(name='Total').sort_values('Total', ascending=False).head(5).reset_index(drop=True)
+    df_rank = _calc(visao, 'ranking_5', lambda: rollups.ranking(rollups.as_rollup(df), n=5))
     
     if df_rank.empty: return
     
@@ -150,89 +235,157 @@ def render_ranking_section(df):
                 </div>
             """, unsafe_allow_html=True)
 
-def render_main_charts(df):
+CRITERIOS_SLA = ["Média", "P90"]
+
+def render_main_charts(df, visao=None):
     st.markdown("<br><br>", unsafe_allow_html=True)
     c1, c2 = st.columns([2, 1])
+    cubo = rollups.as_rollup(df)
     
     with c1:
         st.markdown("<p style='font-size:16px; font-weight:800; color:#0f172a; margin-bottom:15px;'>📊 Eficiência Analítica (Média Diária)</p>", unsafe_allow_html=True)
-        n_dias = max(df['Data'].nunique(), 1)
-        df_vol = df.groupby('Colaborador').agg(Liquido=('Eh_Novo_Episodio', 'sum')).reset_index()
-        df_vol['Media_Dia'] = (df_vol['Liquido'] / n_dias).round(1)
-        df_vol = df_vol.sort_values('Media_Dia', ascending=True)
+        df_vol = _calc(visao, 'eficiencia', lambda: metrics.eficiencia_diaria(cubo))
+        # Top N colaboradores + "Outros" (média dos demais); maior no topo do gráfico horizontal
+        agrupado = charts.top_n_outros(df_vol, 'Colaborador', ['Media_Dia', 'Liquido'], charts.max_categorias(), agg='mean')
+        if agrupado is not df_vol:
+            df_vol = agrupado.round({'Media_Dia': 1}).iloc[::-1]
         
-        fig = px.bar(df_vol, y='Colaborador', x='Media_Dia', orientation='h', color_discrete_sequence=[THEME['primary']], text_auto=True)
-        fig.update_traces(textposition='outside')
-        fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', margin=dict(l=10, r=40, t=10, b=10), height=450, showlegend=False, xaxis=dict(showgrid=False), yaxis=dict(showgrid=True, gridcolor='#f1f5f9'))
-        st.plotly_chart(fig, use_container_width=True)
+        def build(df_vol):
+            fig = px.bar(df_vol, y='Colaborador', x='Media_Dia', orientation='h', color_discrete_sequence=[THEME['primary']], text_auto=True)
+            fig.update_traces(textposition='outside')
+            fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', margin=dict(l=10, r=40, t=10, b=10), height=450, showlegend=False, xaxis=dict(showgrid=False), yaxis=dict(showgrid=True, gridcolor='#f1f5f9'))
+            return fig
+        st.plotly_chart(charts.cached_figure('eficiencia', df_vol[['Colaborador', 'Media_Dia']], build), use_container_width=True)
 
     with c2:
         st.markdown("<p style='font-size:16px; font-weight:800; color:#0f172a; margin-bottom:15px;'>⚠️ Risk Analysis (SLA)</p>", unsafe_allow_html=True)
-        df_stats = df.groupby('Colaborador').agg(TMA=('TMA_Valido', 'mean'), Volume=('Eh_Novo_Episodio', 'sum')).reset_index()
-        media_tma_equipe = df_stats['TMA'].mean()
-        
-        # Logica Auditada de Alerta: Quem tem volume alto (> media + 20%) tem o limite de TMA flexibilizado para +50% da media.
-        # Caso contrario, o limite padrao e +30% da media.
-        media_vol = df_stats['Volume'].mean()
-        df_stats['Limite_TMA'] = np.where(df_stats['Volume'] > media_vol * 1.2, media_tma_equipe * 1.5, media_tma_equipe * 1.3)
-        alertas = df_stats[df_stats['TMA'] > df_stats['Limite_TMA']].head(3)
+        # Critério do alerta: TMA médio ou P90 (cauda de atendimentos lentos, via sketches de TMA)
+        criterio = st.radio("Critério do SLA", CRITERIOS_SLA, horizontal=True, key="criterio_sla", label_visibility="collapsed") if visao is not None else CRITERIOS_SLA[0]
+        sketches = visao.sketches if criterio != CRITERIOS_SLA[0] else None
+        # Logica Auditada de Alerta (limite de TMA flexibilizado para quem tem volume alto)
+        if sketches is None:
+            criterio = CRITERIOS_SLA[0]
+            alertas = _calc(visao, 'alertas_sla_3', lambda: metrics.alertas_sla(cubo, n=3))
+        else:
+            alertas = _calc(visao, 'alertas_sla_p90_3', lambda: metrics.alertas_sla_percentil(cubo, sketches, n=3, q=0.9))
         
         if alertas.empty:
             st.markdown('<div style="background:#f0fdf4; border:1px solid #dcfce7; border-radius:15px; padding:40px; text-align:center;"><div style="font-size:40px; margin-bottom:10px;">🛡️</div><div style="font-weight:800; color:#16a34a;">OPERATIONAL STABILITY</div><div style="font-size:12px; color:#16a34a; font-weight:500;">Metricas dentro do esperado.</div></div>', unsafe_allow_html=True)
         else:
+            rotulo_tma = "TMA" if criterio == CRITERIOS_SLA[0] else "TMA P90"
             for _, r in alertas.iterrows():
-                st.markdown(f'<div style="background:#fff1f2; border:1px solid #ffe4e6; border-radius:12px; padding:15px; margin-bottom:12px; border-left:5px solid #e11d48;"><div style="font-weight:800; color:#9f1239; font-size:14px;">{r["Colaborador"]}</div><div style="font-size:12px; color:#e11d48; font-weight:500;">TMA Critico: {r["TMA"]:.1f} min</div></div>', unsafe_allow_html=True)
+                st.markdown(f'<div style="background:#fff1f2; border:1px solid #ffe4e6; border-radius:12px; padding:15px; margin-bottom:12px; border-left:5px solid #e11d48;"><div style="font-weight:800; color:#9f1239; font-size:14px;">{r["Colaborador"]}</div><div style="font-size:12px; color:#e11d48; font-weight:500;">{rotulo_tma} Critico: {r["TMA"]:.1f} min</div></div>', unsafe_allow_html=True)
 
-def render_capacity_analysis(df):
+def render_capacity_analysis(df, visao=None):
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown("<div class='kpi-card'><p style='font-size:16px; font-weight:800; color:#0f172a; margin-bottom:20px;'>⚡ Capacidade Projetada vs TMA Real</p>", unsafe_allow_html=True)
-    df_tma = df.groupby('Colaborador')['TMA_Valido'].agg(['mean', 'count']).reset_index()
-    df_tma = df_tma[df_tma['count'] > 5]
+    # Jornada completa descontada a ociosidade (parâmetros em business_logic.JORNADA)
+    df_tma = _calc(visao, 'capacidade', lambda: metrics.capacidade(rollups.as_rollup(df)))
+    # Top N por capacidade + "Outros" (média dos demais)
+    df_tma = charts.top_n_outros(df_tma, 'Colaborador', ['Capacidade', 'mean'], charts.max_categorias(), agg='mean')
+    df_tma = df_tma.assign(Capacidade=df_tma['Capacidade'].fillna(0).round().astype(int))
     
-    # 30% Ociosidade (70% produtivo)
-    TEMPO_UTIL = (17.3 - 7.5) * 60 * 0.70 
-    df_tma['Capacidade'] = (TEMPO_UTIL / df_tma['mean']).fillna(0).astype(int)
-    df_tma = df_tma.sort_values('Capacidade', ascending=False)
-    
-    fig = go.Figure()
-    fig.add_trace(go.Bar(x=df_tma['Colaborador'], y=df_tma['Capacidade'], marker_color='#dbeafe', text=df_tma['Capacidade'], textposition='outside'))
-    fig.add_trace(go.Scatter(x=df_tma['Colaborador'], y=df_tma['mean'], yaxis='y2', line=dict(color='#ef4444', width=3), text=df_tma['mean'].round(1), mode='lines+markers+text', textposition='top center'))
-    fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', height=400, margin=dict(l=10, r=40, t=10, b=10), yaxis=dict(title='Capacidade/Dia'), yaxis2=dict(title='TMA (min)', overlaying='y', side='right', showgrid=False), showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    def build(df_tma):
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=df_tma['Colaborador'], y=df_tma['Capacidade'], marker_color='#dbeafe', text=df_tma['Capacidade'], textposition='outside'))
+        fig.add_trace(go.Scatter(x=df_tma['Colaborador'], y=df_tma['mean'], yaxis='y2', line=dict(color='#ef4444', width=3), text=df_tma['mean'].round(1), mode='lines+markers+text', textposition='top center'))
+        fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', height=400, margin=dict(l=10, r=40, t=10, b=10), yaxis=dict(title='Capacidade/Dia'), yaxis2=dict(title='TMA (min)', overlaying='y', side='right', showgrid=False), showlegend=False)
+        return fig
+    st.plotly_chart(charts.cached_figure('capacidade', df_tma[['Colaborador', 'Capacidade', 'mean']], build), use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+    if visao is not None and visao.sketches is not None:
+        render_tma_percentiles(visao)
+
+def render_tma_percentiles(visao):
+    """P50/P90/P99 do TMA por colaborador e da equipe, a partir dos sketches da seleção."""
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown("<div class='kpi-card'><p style='font-size:16px; font-weight:800; color:#0f172a; margin-bottom:20px;'>⏱️ Distribuição do TMA (P50 / P90 / P99)</p>", unsafe_allow_html=True)
+    sketches = visao.sketches
+    equipe = _calc(visao, 'tma_percentis_equipe', lambda: tma_sketch.percentis(sketches))
+    if equipe['TMA_Qtd'].iloc[0] == 0:
+        st.warning("Sem TMAs válidos no período selecionado.")
+        st.markdown("</div>", unsafe_allow_html=True)
+        return
+    e = equipe.iloc[0]
+    st.caption(f"Equipe • P50 {e['P50']:.1f} min • P90 {e['P90']:.1f} min • P99 {e['P99']:.1f} min • {int(e['TMA_Qtd']):,} TMAs válidos")
+    # Maiores P90 primeiro; os demais colaboradores somados em "Outros" (percentis do grupo)
+    n = charts.max_categorias()
+    df_pct = _calc(visao, f'tma_percentis_{n}', lambda: tma_sketch.percentis_colaborador(sketches, n=n, rotulo=charts.ROTULO_OUTROS))
+
+    def build(df_pct):
+        fig = go.Figure()
+        for coluna, cor in (('P50', '#dbeafe'), ('P90', THEME['primary']), ('P99', THEME['danger'])):
+            fig.add_trace(go.Bar(x=df_pct['Colaborador'], y=df_pct[coluna], name=coluna, marker_color=cor))
+        fig.update_layout(barmode='group', plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', height=400, margin=dict(l=10, r=10, t=10, b=10), yaxis=dict(title='TMA (min)', gridcolor='#f1f5f9'), legend=dict(orientation='h', y=1.1))
+        return fig
+    st.plotly_chart(charts.cached_figure('tma_percentis', df_pct[['Colaborador', 'P50', 'P90', 'P99']], build), use_container_width=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
-def render_heatmap(df):
+def render_heatmap(df, visao=None):
     st.markdown("<br>", unsafe_allow_html=True)
     st.markdown("<div class='kpi-card'><p style='font-size:16px; font-weight:800; color:#0f172a; margin-bottom:20px;'>🔥 Mapa de Calor: Produtividade por Hora</p>", unsafe_allow_html=True)
     
-    df_heat = df.copy()
+    cubo = rollups.as_rollup(df)
     
-    if not df_heat.empty:
+    if not cubo.empty:
         # Agrupa por Hora e Dia da Semana
-        df_grp = df_heat.groupby(['Dia_Semana', 'Hora_Cheia']).size().reset_index(name='Atendimentos')
+        df_grp = _calc(visao, 'heatmap', lambda: rollups.heatmap(cubo))
         
         # Ordem dos dias sem caracteres especiais para evitar problemas de encoding
         ordem_dias = ['Segunda-Feira', 'Terça-Feira', 'Quarta-Feira', 'Quinta-Feira', 'Sexta-Feira', 'Sábado', 'Domingo']
         
-        fig_heat = px.density_heatmap(
-            df_grp, 
-            x='Dia_Semana', 
-            y='Hora_Cheia', 
-            z='Atendimentos',
-            category_orders={"Dia_Semana": ordem_dias},
-            color_continuous_scale='Blues',
-            text_auto=True
-        )
-        
-        fig_heat.update_layout(
-            height=450,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            margin=dict(l=10, r=10, b=10, t=10),
-            xaxis_title="Dia da Semana",
-            yaxis_title="Hora do Dia"
-        )
-        st.plotly_chart(fig_heat, use_container_width=True)
+        def build(df_grp):
+            fig_heat = px.density_heatmap(
+                df_grp, 
+                x='Dia_Semana', 
+                y='Hora_Cheia', 
+                z='Atendimentos',
+                category_orders={"Dia_Semana": ordem_dias},
+                color_continuous_scale='Blues',
+                text_auto=True
+            )
+            
+            fig_heat.update_layout(
+                height=450,
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                margin=dict(l=10, r=10, b=10, t=10),
+                xaxis_title="Dia da Semana",
+                yaxis_title="Hora do Dia"
+            )
+            return fig_heat
+        st.plotly_chart(charts.cached_figure('heatmap', df_grp, build), use_container_width=True)
     else:
         st.warning("Sem dados suficientes para gerar o mapa de calor.")
     st.markdown("</div>", unsafe_allow_html=True)
+
+# ==============================================================================
+# SEÇÕES (renderização sob demanda)
+# ==============================================================================
+SECOES = ["🏆 Desempenho", "⚡ Capacidade", "🔥 Mapa de Calor", "📦 Pedidos & Portais"]
+
+@st.fragment
+def render_sections(visao):
+    """
+    Seletor de seção + conteúdo da seção escolhida. Só a seção visível agrega e monta
+    figuras; trocar de seção reexecuta apenas este fragmento, não o app inteiro.
+    """
+    st.markdown("<br>", unsafe_allow_html=True)
+    secao = st.segmented_control("Seção", SECOES, default=SECOES[0], key="secao", label_visibility="collapsed") or SECOES[0]
+    cubo = visao.cubo
+
+    if secao == SECOES[0]:
+        with instrumentation.stage("ranking", cubo):
+            render_ranking_section(cubo, visao)
+        with instrumentation.stage("graficos_principais", cubo):
+            render_main_charts(cubo, visao)
+    elif secao == SECOES[1]:
+        with instrumentation.stage("capacidade", cubo):
+            render_capacity_analysis(cubo, visao)
+    elif secao == SECOES[2]:
+        with instrumentation.stage("mapa_calor", cubo):
+            render_heatmap(cubo, visao)
+    else:
+        with instrumentation.stage("pedidos_portal", visao.df):
+            pedidos_portal.render_pedidos_portal(visao.df, cubo, visao)
+
@@ -0,0 +1,76 @@
+import threading
+
+import pandas as pd
+
+def result_nbytes(valor):
+    """Memória aproximada de um resultado de painel (DataFrames, Series, tuplas e dicionários)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=False).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=False))
+    if isinstance(valor, (tuple, list)):
+        return sum(result_nbytes(v) for v in valor)
+    if isinstance(valor, dict):
+        return sum(result_nbytes(v) for v in valor.values())
+    return 64
+
+class View:
+    """
+    Uma seleção do painel (versão dos dados + FilterSpec): linhas e cubo filtrados,
+    mais os resultados de cada painel, calculados sob demanda e guardados na própria
+    seleção. A seleção inteira é uma entrada do cache LRU, então o limite de
+    entradas conta seleções, não painéis, e a memória da entrada cresce com os
+    resultados. Voltar a uma seleção recente reaproveita tudo.
+
+    O cache é compartilhado entre sessões, não um por sessão: supervisores
+    diferentes abrem muitas vezes a mesma seleção (ex.: o dia corrente, todos os
+    setores), que é calculada uma vez só, e a memória fica limitada por servidor
+    em vez de crescer com o número de sessões.
+    Os resultados são compartilhados entre sessões e NÃO devem ser modificados.
+    """
+
+    def __init__(self, cache, versao, filtro, df, cubo, sketches=None):
+        self._cache = cache
+        self.versao = versao
+        self.filtro = filtro
+        self.df = df
+        self.cubo = cubo
+        self._sketches = sketches
+        self._resultados = {}     # nome do painel -> resultado
+        self._pendentes = {}      # nome do painel -> Lock do cálculo em andamento
+        self._lock = threading.Lock()
+        self._bytes = result_nbytes((df, cubo))
+
+    @property
+    def chave(self):
+        return (self.versao, self.filtro)
+
+    def nbytes(self):
+        return self._bytes
+
+    @property
+    def sketches(self):
+        """Sketches de TMA da seleção (tma_sketch), calculados só quando um painel pede; None se indisponíveis."""
+        return None if self._sketches is None else self.get('tma_sketches', self._sketches)
+
+    def get(self, nome, compute):
+        """Resultado do painel `nome` para esta seleção (calculado uma vez, mesmo com várias sessões pedindo)."""
+        with self._lock:
+            if nome in self._resultados:
+                return self._resultados[nome]
+            nome_lock = self._pendentes.setdefault(nome, threading.Lock())
+
+        with nome_lock:
+            with self._lock:
+                if nome in self._resultados:
+                    return self._resultados[nome]
+            try:
+                valor = compute()
+                with self._lock:
+                    self._resultados[nome] = valor
+                    self._bytes += result_nbytes(valor)
+            finally:
+                with self._lock:
+                    self._pendentes.pop(nome, None)
+        self._cache.resize(self.chave, self.nbytes())
+        return valor
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from benchmarks.generator import generate_sheet
+from modules import business_logic
+from modules.episode_engine import IncrementalProcessor, process_data_chunked
+from modules.incremental import IncrementalIngestor
+
+@pytest.fixture(scope='module')
+def planilha():
+    return generate_sheet(6000, seed=11, data_fim='2024-03-28')
+
+@pytest.fixture(scope='module')
+def esperado(planilha):
+    return business_logic.process_data(planilha.copy())
+
+def _comparar(resultado, esperado):
+    assert_frame_equal(resultado[esperado.columns], esperado, check_categorical=False)
+
+@pytest.mark.parametrize('tamanho', [500, 1777, 6000])
+def test_process_data_chunked_igual_ao_completo(planilha, esperado, tamanho):
+    blocos = (planilha.iloc[i:i + tamanho].copy() for i in range(0, len(planilha), tamanho))
+    _comparar(process_data_chunked(blocos), esperado)
+
+def test_ingestao_incremental_igual_ao_completo(planilha, esperado):
+    # A planilha cresce em lotes de tamanhos variados; cada sync anexa só as linhas novas
+    cortes = np.unique(np.r_[np.random.default_rng(3).integers(1, len(planilha), 12), len(planilha)])
+    visivel = {'n': int(cortes[0])}
+    ingestor = IncrementalIngestor(lambda start: planilha.iloc[start:visivel['n']].copy())
+    processor = IncrementalProcessor()
+
+    clean, _, completo = ingestor.sync()
+    assert completo
+    processor.rebuild(clean, ingestor.versao)
+    for corte in cortes[1:]:
+        visivel['n'] = int(corte)
+        clean, novo, completo = ingestor.sync()
+        assert not completo
+        processor.append(novo, clean, ingestor.versao)
+
+    assert ingestor.linhas_lidas == len(planilha)
+    _comparar(processor.processed, esperado)
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from benchmarks.generator import generate_sheet
+from modules import business_logic, query_engine, rollups
+from modules.filters import FilterSpec, date_bounds
+
+def _planilha_sem_hora(n_linhas=5000):
+    """Data com a hora do contato ('%d/%m/%Y %H:%M:%S') e sem coluna Hora."""
+    raw = generate_sheet(n_linhas, seed=7, data_fim='2024-03-28')
+    datas = raw['Data'].where(raw['Data'] == '', raw['Data'] + ' ' + raw['Hora'])
+    return raw.drop(columns='Hora').assign(Data=datas)
+
+def _metas_ordenadas(df):
+    chaves = ['Colaborador', 'Data_Str', 'Setor']
+    return df[chaves + ['Hora_Entrada', 'Meta_SAC', 'Meta_PEND']].sort_values(chaves, ignore_index=True)
+
+@pytest.fixture(scope='module')
+def processado():
+    return business_logic.process_data(_planilha_sem_hora())
+
+def test_cubo_agrega_por_dia_com_hora_na_data(processado):
+    assert (processado['Data'] != processado['Data'].dt.normalize()).any()
+    cubo = rollups.build_rollup(processado)
+    assert (cubo['Data'] == cubo['Data'].dt.normalize()).all()
+    presencas = processado.groupby(['Colaborador', processado['Data'].dt.normalize(), 'Setor'], observed=True).ngroups
+    assert len(cubo.groupby(['Colaborador', 'Data', 'Setor'], observed=True)) == presencas
+    assert rollups.dias_no_periodo(cubo) == processado['Data'].dt.normalize().nunique()
+
+def test_metas_do_cubo_iguais_as_da_base(processado):
+    cubo = rollups.build_rollup(processado)
+    esperado = business_logic.calculate_meta_logic(processado, processado['Data'].max())
+    assert_frame_equal(_metas_ordenadas(rollups.metas(cubo)), _metas_ordenadas(esperado), check_categorical=False)
+
+def test_cubo_duckdb_igual_ao_pandas(processado, tmp_path):
+    pytest.importorskip('duckdb')
+    base = query_engine.export_base(processado, 'teste', str(tmp_path))
+    inicio, fim = date_bounds(processado)
+    filtro = FilterSpec(inicio, fim)
+    esperado = rollups.build_rollup(processado)
+    cubo = base.rollup(filtro)
+    for c in esperado.columns:
+        assert_frame_equal(cubo[[c]], esperado[[c]], check_dtype=False, check_categorical=False)
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from modules.cache import VersionedFrameCache
+from modules.views import View
+
+def _visao(cache, filtro):
+    df = pd.DataFrame({'x': range(10)})
+    return cache.get_or_compute(('v1', filtro), lambda: View(cache, 'v1', filtro, df, df), sizeof=View.nbytes)
+
+def test_paineis_ficam_na_entrada_da_selecao():
+    cache = VersionedFrameCache(max_entries=2)
+    visao = _visao(cache, 'a')
+    for i in range(20):
+        visao.get(f'painel_{i}', lambda i=i: pd.Series(range(i)))
+    _visao(cache, 'b')
+    assert cache.stats()['entradas'] == 2
+    assert _visao(cache, 'a') is visao
+    chamadas = []
+    assert visao.get('painel_3', lambda: chamadas.append(1)).tolist() == [0, 1, 2]
+    assert not chamadas
+
+def test_memoria_da_selecao_cresce_com_os_resultados():
+    cache = VersionedFrameCache(max_entries=4)
+    visao = _visao(cache, 'a')
+    antes = cache.stats()['bytes']
+    visao.get('painel', lambda: pd.DataFrame({'y': range(1000)}))
+    assert cache.stats()['bytes'] == visao.nbytes() > antes